@@ -0,0 +1,50 @@
+import unittest
+
+class Test(unittest.TestCase):
+
+    def test(self):
+        from statemachine import SMMDP, SMTransition
+        smmdp = SMMDP([
+              SMTransition('1', 'a1', [ ['2', 1, 3]]),
+              SMTransition('2', 'a1', [ ['3', .5, 5], ['4', .5, 10]]),
+              SMTransition('2', 'a2', [ ['3', 1, 2]]),
+              SMTransition('3', 'a1', [ ['1', .5, 5], ['6', .5, 8]]),
+              SMTransition('3', 'a2', [ ['1', .9, 10], ['7', .1, 0]]),
+              SMTransition('4', 'a1', [ ['5',1,1]]),
+              SMTransition('4', 'a2', [ ['5',.9,10], ['7',.05,0], ['8',.05,0]]),
+              SMTransition('5', 'a1', [ ['6',1,1]]),
+              SMTransition('6', 'a1', [ ['4',1,1]]),
+              SMTransition('7', 'a1', [ ['8',1,0]]),
+              SMTransition('8', 'a1', [ ['7',1,1]]),
+            ], '1'
+          )
+
+        import algos
+        from algos import value_iteration, compute_sweep_order
+        pol, vivalue = value_iteration(mdp=smmdp, gamma=.9, epsilon=.001)
+
+        # the states of a component are backed up after the states of its successor components
+        order = compute_sweep_order(smmdp, 'scc')
+        self.assertEqual(set(order[:2]), { smmdp.get_state('7'), smmdp.get_state('8') })
+        self.assertEqual(set(order[2:5]), { smmdp.get_state('4'), smmdp.get_state('5'), smmdp.get_state('6') })
+        self.assertEqual(compute_sweep_order(smmdp, 'reverse_bfs')[-1], smmdp.get_state('1'))
+
+        from telemetry import MemoryTelemetry
+        for sweep_order in algos.SWEEP_ORDERS:
+            telemetry = MemoryTelemetry()
+            gspol, gsvalue = value_iteration(mdp=smmdp, gamma=.9, epsilon=.001, in_place=True, sweep_order=sweep_order, telemetry=telemetry)
+            self.assertGreater(len(telemetry.records()), 0)
+            for state in smmdp.states():
+                self.assertAlmostEqual(vivalue.value(state), gsvalue.value(state), delta=.01)
+                self.assertEqual(pol.action(state), gspol.action(state))
+
+        with self.assertRaises(ValueError):
+            value_iteration(mdp=smmdp, gamma=.9, epsilon=.001, in_place=True, sweep_order='random')
+
+def main():
+    unittest.main()
+
+if __name__ == "__main__":
+    main()
+
+# eof
@@ -0,0 +1,40 @@
+import unittest
+
+class Test(unittest.TestCase):
+
+    def test(self):
+        from map import basic_map, DungeonMDP
+        from example1 import example_1
+        from modelling import modify_action_reward
+        from telemetry import CountingMDP
+        from algos import prioritized_sweeping, incremental_value_iteration, compute_predecessors
+
+        for mdp in [ example_1(), DungeonMDP(basic_map()) ]:
+            preds = compute_predecessors(mdp)
+            pol, value = prioritized_sweeping(mdp, gamma=.9, epsilon=.0001, predecessors=preds)
+
+            # the reward of the action selected in the initial state is increased
+            act      = pol.action(mdp.initial_state())
+            modified = [ (s, act) for s in mdp.states() if act in mdp.applicable_actions(s) ]
+            newmdp   = modify_action_reward(mdp, act, 5)
+
+            full = CountingMDP(newmdp)
+            fullpol, fullvalue = prioritized_sweeping(full, gamma=.9, epsilon=.0001)
+            incr = CountingMDP(newmdp)
+            incrpol, incrvalue = incremental_value_iteration(incr, gamma=.9, epsilon=.0001, previous_value=value, modified=modified, previous_pi=pol, predecessors=preds)
+            self.assertLess(incr.nb_next_states_, full.nb_next_states_)
+            for state in mdp.states():
+                self.assertAlmostEqual(fullvalue.value(state), incrvalue.value(state), delta=.01)
+                self.assertAlmostEqual(fullvalue.value(state),
+                                       sum(p * (r + .9 * fullvalue.value(s)) for s, p, r in newmdp.next_states(state, incrpol.action(state))),
+                                       delta=.01)
+            # the previous value is not modified
+            self.assertLess(value.value(mdp.initial_state()), incrvalue.value(mdp.initial_state()))
+
+def main():
+    unittest.main()
+
+if __name__ == "__main__":
+    main()
+
+# eof
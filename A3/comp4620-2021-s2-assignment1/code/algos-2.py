@@ -0,0 +1,26 @@
+import unittest
+
+class Test(unittest.TestCase):
+
+    def test(self):
+        from map import basic_map, DungeonMDP
+        from example1 import example_1
+        from example2 import example_2
+        from algos import value_iteration, prioritized_sweeping, compute_predecessors
+
+        for mdp in [ example_1(), example_2(), DungeonMDP(basic_map()) ]:
+            pol, vivalue = value_iteration(mdp=mdp, gamma=.9, epsilon=.0001)
+            pspol, psvalue = prioritized_sweeping(mdp=mdp, gamma=.9, epsilon=.0001, predecessors=compute_predecessors(mdp))
+            for state in mdp.states():
+                self.assertAlmostEqual(vivalue.value(state), psvalue.value(state), delta=.01)
+                self.assertAlmostEqual(vivalue.value(state),
+                                       sum(p * (r + .9 * vivalue.value(s)) for s, p, r in mdp.next_states(state, pspol.action(state))),
+                                       delta=.01)
+
+def main():
+    unittest.main()
+
+if __name__ == "__main__":
+    main()
+
+# eof
@@ -0,0 +1,43 @@
+import unittest
+
+class Test(unittest.TestCase):
+
+    def test(self):
+        from example1 import example_1
+        from map import basic_map, DungeonMDP
+        from algos import value_iteration, policy_iteration, compute_v_of_policy
+
+        for mdp in [ example_1(), DungeonMDP(basic_map()) ]:
+            pol, vivalue = value_iteration(mdp=mdp, gamma=.9, epsilon=.001)
+
+            itvalue = compute_v_of_policy(mdp, pol, gamma=.9, stopping_threshold=.001)
+            lu      = compute_v_of_policy(mdp, pol, gamma=.9, stopping_threshold=.001, method='direct')
+            krylov  = compute_v_of_policy(mdp, pol, gamma=.9, stopping_threshold=.001, starting_value=itvalue, method='krylov')
+            for state in mdp.states():
+                self.assertAlmostEqual(itvalue.value(state), lu.value(state), delta=.01)
+                self.assertAlmostEqual(itvalue.value(state), krylov.value(state), delta=.01)
+
+        mdp = example_1()
+        pol, vivalue = value_iteration(mdp=mdp, gamma=.99, epsilon=.0001)
+        pipol = policy_iteration(mdp, gamma=.99, epsilon=.0001, stopping_threshold=.0001, method='direct')
+        for state in mdp.states():
+            self.assertEqual(pol.action(state), pipol.action(state))
+
+        # the partial evaluations of modified policy iteration are iterative
+        with self.assertRaises(ValueError):
+            policy_iteration(mdp, gamma=.99, epsilon=.0001, stopping_threshold=.0001, method='direct', nb_sweeps=3)
+
+        # a Krylov solver that does not converge warns that the value is imprecise
+        import scipy.sparse.linalg
+        from unittest import mock
+        with mock.patch.object(scipy.sparse.linalg, 'bicgstab', lambda matrix, rhs, **kwargs: (rhs, 1)):
+            with self.assertWarns(RuntimeWarning):
+                compute_v_of_policy(mdp, pol, gamma=.9, stopping_threshold=.001, method='krylov')
+
+def main():
+    unittest.main()
+
+if __name__ == "__main__":
+    main()
+
+# eof
@@ -0,0 +1,40 @@
+import unittest
+
+class Test(unittest.TestCase):
+
+    def test(self):
+        from example1 import example_1
+        from example2 import example_2
+        from statemachine import SMMDP, SMTransition
+        from algos import value_iteration, policy_iteration, compute_v_of_policy
+
+        smmdp = SMMDP([
+              SMTransition('1', 'a1', [ ['2', 1, 3]]),
+              SMTransition('2', 'a1', [ ['3', .5, 5], ['4', .5, 10]]),
+              SMTransition('2', 'a2', [ ['3', 1, 2]]),
+              SMTransition('3', 'a1', [ ['1', .5, 5], ['6', .5, 8]]),
+              SMTransition('3', 'a2', [ ['1', .9, 10], ['7', .1, 0]]),
+              SMTransition('4', 'a1', [ ['5',1,1]]),
+              SMTransition('4', 'a2', [ ['5',.9,10], ['7',.05,0], ['8',.05,0]]),
+              SMTransition('5', 'a1', [ ['6',1,1]]),
+              SMTransition('6', 'a1', [ ['4',1,1]]),
+              SMTransition('7', 'a1', [ ['8',1,0]]),
+              SMTransition('8', 'a1', [ ['7',1,1]]),
+            ], '1'
+          )
+
+        for mdp in [ example_1(), example_2(), smmdp ]:
+            pol, vivalue = value_iteration(mdp=mdp, gamma=.9, epsilon=.0001)
+            for nb_sweeps in [ None, 1, 5 ]:
+                pipol   = policy_iteration(mdp, gamma=.9, epsilon=.0001, stopping_threshold=.0001, nb_sweeps=nb_sweeps)
+                pivalue = compute_v_of_policy(mdp, pipol, gamma=.9, stopping_threshold=.0001)
+                for state in mdp.states():
+                    self.assertAlmostEqual(vivalue.value(state), pivalue.value(state), delta=.01)
+
+def main():
+    unittest.main()
+
+if __name__ == "__main__":
+    main()
+
+# eof
@@ -0,0 +1,49 @@
+import unittest
+
+class Test(unittest.TestCase):
+
+    def test(self):
+        from example1 import example_1
+        from algos import value_iteration, compute_v_of_policy, ConvergenceCheck, STOPPING_RULES
+
+        mdp = example_1()
+        pol, vivalue = value_iteration(mdp=mdp, gamma=.9, epsilon=.0001)
+        for rule in STOPPING_RULES:
+            rpol, rvalue = value_iteration(mdp=mdp, gamma=.9, epsilon=.01, stopping_rule=rule)
+            gspol, gsvalue = value_iteration(mdp=mdp, gamma=.9, epsilon=.01, in_place=True, stopping_rule=rule)
+            for state in mdp.states():
+                self.assertEqual(pol.action(state), rpol.action(state))
+                self.assertEqual(pol.action(state), gspol.action(state))
+            # the greedy policy is .01-optimal
+            if rule == 'epsilon_optimal':
+                rpvalue = compute_v_of_policy(mdp, rpol, gamma=.9, stopping_threshold=.0001, stopping_rule=rule)
+                for state in mdp.states():
+                    self.assertAlmostEqual(vivalue.value(state), rpvalue.value(state), delta=.01)
+
+        # with gamma = 0, one backup gives the optimal value
+        zpol, zvalue = value_iteration(mdp=mdp, gamma=0, epsilon=.01, stopping_rule='epsilon_optimal')
+        for state in mdp.states():
+            self.assertAlmostEqual(zvalue.value(state), max(sum(p * r for _, p, r in mdp.next_states(state, a)) for a in mdp.applicable_actions(state)))
+
+        # the span ignores a constant shift of the values
+        check = ConvergenceCheck('span', .1, .9)
+        check.start(vivalue)
+        for state in mdp.states():
+            check.update(state, vivalue.value(state) + 5)
+        self.assertTrue(check.converged())
+        check = ConvergenceCheck('difference', .1, .9)
+        check.start(vivalue)
+        for state in mdp.states():
+            check.update(state, vivalue.value(state) + 5)
+        self.assertFalse(check.converged())
+
+        with self.assertRaises(ValueError):
+            ConvergenceCheck('relative', .1, .9)
+
+def main():
+    unittest.main()
+
+if __name__ == "__main__":
+    main()
+
+# eof
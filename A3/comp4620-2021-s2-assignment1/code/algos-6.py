@@ -0,0 +1,44 @@
+import unittest
+
+class Test(unittest.TestCase):
+
+    def test(self):
+        from random import seed
+        from statemachine import SMMDP, SMTransition
+        from algos import OutcomeSampler, simulate, ExplicitPolicy
+
+        smmdp = SMMDP([
+              SMTransition('0', 'a', [ ['0', .1, 0], ['1', .2, 1], ['2', .3, 2], ['3', .4, 3] ]),
+              SMTransition('1', 'a', [ ['0', 1, 0] ]),
+              SMTransition('2', 'a', [ ['0', .5, 0], ['1', .6, 0] ]),
+              SMTransition('3', 'a', [ ['0', 1, 0] ]),
+            ], '0'
+          )
+        s0 = smmdp.get_state('0')
+        a  = smmdp.get_action('a')
+
+        seed(0)
+        sampler = OutcomeSampler(smmdp)
+        counts  = { s : 0 for s in smmdp.states() }
+        for _ in range(100000):
+            next_s, rew = sampler.sample(s0, a)
+            counts[next_s] += 1
+        for next_s, prob, rew in smmdp.next_states(s0, a):
+            self.assertAlmostEqual(counts[next_s] / 100000, prob, delta=.01)
+
+        # the distribution of state 2 does not sum to 1
+        with self.assertRaises(ValueError):
+            sampler.sample(smmdp.get_state('2'), a)
+
+        from example1 import example_1
+        mdp = example_1()
+        h = simulate(mdp, ExplicitPolicy(mdp), 20)
+        self.assertEqual(h.length(), 20)
+
+def main():
+    unittest.main()
+
+if __name__ == "__main__":
+    main()
+
+# eof
@@ -0,0 +1,104 @@
+import unittest
+
+class Test(unittest.TestCase):
+
+    def test(self):
+        import os
+        import tempfile
+        import numpy as np
+        from statemachine import SMMDP, SMTransition
+        smmdp = SMMDP([
+              SMTransition('1', 'a1', [ ['2', 1, 3]]),
+              SMTransition('2', 'a1', [ ['3', .5, 5], ['4', .5, 10]]),
+              SMTransition('2', 'a2', [ ['3', 1, 2]]),
+              SMTransition('3', 'a1', [ ['1', .5, 5], ['6', .5, 8]]),
+              SMTransition('3', 'a2', [ ['1', .9, 10], ['7', .1, 0]]),
+              SMTransition('4', 'a1', [ ['5',1,1]]),
+              SMTransition('4', 'a2', [ ['5',.9,10], ['7',.05,0], ['8',.05,0]]),
+              SMTransition('5', 'a1', [ ['6',1,1]]),
+              SMTransition('6', 'a1', [ ['4',1,1]]),
+              SMTransition('7', 'a1', [ ['8',1,0]]),
+              SMTransition('8', 'a1', [ ['7',1,1]]),
+            ], '1'
+          )
+
+        from algos import value_iteration, policy_iteration, same_policy, is_policy_nearly_greedy, compute_q_from_v
+        from checkpoint import Checkpoint
+        from telemetry import MemoryTelemetry
+        pol, vivalue = value_iteration(mdp=smmdp, gamma=.9, epsilon=.001)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            # a coarse run stands for a run that died halfway
+            checkpoint = Checkpoint(os.path.join(tmp, 'vi'), every=5)
+            self.assertFalse(checkpoint.exists())
+            value_iteration(mdp=smmdp, gamma=.9, epsilon=1, checkpoint=checkpoint)
+            self.assertTrue(checkpoint.exists())
+            self.assertIsInstance(checkpoint.values_array(), np.memmap)
+            self.assertEqual(len(checkpoint.values_array()), len(smmdp.states()))
+
+            for in_place in (False, True):
+                resumed = Checkpoint(os.path.join(tmp, f'vi-{in_place}'))
+                value_iteration(mdp=smmdp, gamma=.9, epsilon=1, checkpoint=resumed)
+                resumed_start = resumed.iteration()
+                telemetry = MemoryTelemetry()
+                respol, resvalue = value_iteration(mdp=smmdp, gamma=.9, epsilon=.001, in_place=in_place, telemetry=telemetry, checkpoint=resumed, resume=True)
+                # the iteration counter continues from the checkpoint
+                self.assertEqual(resumed.iteration(), resumed_start + len(telemetry.records()))
+                for state in smmdp.states():
+                    self.assertAlmostEqual(vivalue.value(state), resvalue.value(state), delta=.01)
+                    self.assertEqual(pol.action(state), respol.action(state))
+                self.assertTrue(same_policy(smmdp, respol, resumed.load_policy(smmdp)))
+
+            # warm start: fewer iterations than from scratch
+            cold, warm = MemoryTelemetry(), MemoryTelemetry()
+            value_iteration(mdp=smmdp, gamma=.9, epsilon=.001, telemetry=cold)
+            warmvalue = checkpoint.load_values(smmdp)
+            value_iteration(mdp=smmdp, gamma=.9, epsilon=.001, telemetry=warm, starting_value=warmvalue)
+            self.assertLess(len(warm.records()), len(cold.records()))
+            self.assertEqual(checkpoint.load_values(smmdp).value(smmdp.get_state('1')), warmvalue.value(smmdp.get_state('1')))
+
+            # policy iteration resumes from the saved policy
+            picheckpoint = Checkpoint(os.path.join(tmp, 'pi'))
+            pipol = policy_iteration(smmdp, .9, .001, .001, checkpoint=picheckpoint)
+            self.assertTrue(same_policy(smmdp, pipol, picheckpoint.load_policy(smmdp)))
+            telemetry = MemoryTelemetry()
+            self.assertTrue(same_policy(smmdp, pipol, policy_iteration(smmdp, .9, .001, .001, telemetry=telemetry, checkpoint=picheckpoint, resume=True)))
+            self.assertEqual(len(telemetry.records('policy_iteration')), 1)
+
+            with self.assertRaises(ValueError):
+                Checkpoint(os.path.join(tmp, 'vi'), every=0)
+            small = SMMDP([ SMTransition('1', 'a1', [ ['1', 1, 1]]) ], '1')
+            with self.assertRaises(ValueError):
+                checkpoint.load_values(small)
+
+            # the order of the states of DungeonMDP depends on the hash seed:
+            # a run started with one seed resumes with another one
+            import subprocess
+            import sys
+            from map import DungeonMDP, basic_map
+            script = '''if True:
+                import sys
+                from algos import value_iteration
+                from checkpoint import Checkpoint
+                from map import DungeonMDP, basic_map
+                value_iteration(DungeonMDP(basic_map()), gamma=.9, epsilon=float(sys.argv[2]), checkpoint=Checkpoint(sys.argv[1]), resume=True)
+            '''
+            dungeon = os.path.join(tmp, 'dungeon')
+            for seed, epsilon in [ ('1', '1'), ('2', '.001') ]:
+                subprocess.run([ sys.executable, '-c', script, dungeon, epsilon ], check=True, cwd=os.path.dirname(os.path.abspath(__file__)), env=dict(os.environ, PYTHONHASHSEED=seed))
+            mdp = DungeonMDP(basic_map())
+            _, dungeonvalue = value_iteration(mdp=mdp, gamma=.9, epsilon=.001)
+            resvalue  = Checkpoint(dungeon).load_values(mdp)
+            respol    = Checkpoint(dungeon).load_policy(mdp)
+            for state in mdp.states():
+                self.assertAlmostEqual(dungeonvalue.value(state), resvalue.value(state), delta=.01)
+            # several actions may be optimal, and their order also depends on the hash seed
+            self.assertTrue(is_policy_nearly_greedy(mdp, respol, .01, compute_q_from_v(mdp, dungeonvalue, .9)))
+
+def main():
+    unittest.main()
+
+if __name__ == "__main__":
+    main()
+
+# eof
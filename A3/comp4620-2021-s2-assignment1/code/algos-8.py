@@ -0,0 +1,39 @@
+import unittest
+
+class Test(unittest.TestCase):
+
+    def test(self):
+        from map import basic_map, DungeonMDP
+        from example1 import example_1
+        from algos import value_iteration, action_elimination_value_iteration
+        from telemetry import MemoryTelemetry
+
+        for mdp in [ example_1(), DungeonMDP(basic_map()) ]:
+            telemetry = MemoryTelemetry()
+            pol, vivalue = value_iteration(mdp=mdp, gamma=.8, epsilon=.001, telemetry=telemetry)
+            aetelemetry = MemoryTelemetry()
+            aepol, aevalue, eliminated = action_elimination_value_iteration(mdp, gamma=.8, epsilon=.001, telemetry=aetelemetry)
+            for state in mdp.states():
+                self.assertAlmostEqual(vivalue.value(state), aevalue.value(state), delta=.001)
+                # the optimal action is never eliminated
+                self.assertFalse(pol.action(state) in eliminated[state])
+                self.assertFalse(aepol.action(state) in eliminated[state])
+                self.assertTrue(eliminated[state] <= set(mdp.applicable_actions(state)))
+            self.assertEqual(len(telemetry.records()), len(aetelemetry.records()))
+            self.assertLess(sum(r.nb_next_states for r in aetelemetry.records()), sum(r.nb_next_states for r in telemetry.records()))
+            self.assertGreater(sum(len(actions) for actions in eliminated.values()), 0)
+
+            epol, evalue = value_iteration(mdp=mdp, gamma=.8, epsilon=.001, eliminate_actions=True)
+            for state in mdp.states():
+                self.assertEqual(evalue.value(state), aevalue.value(state))
+
+        with self.assertRaises(ValueError):
+            value_iteration(mdp=mdp, gamma=.8, epsilon=.001, in_place=True, eliminate_actions=True)
+
+def main():
+    unittest.main()
+
+if __name__ == "__main__":
+    main()
+
+# eof
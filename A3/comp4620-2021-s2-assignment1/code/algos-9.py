@@ -0,0 +1,52 @@
+import unittest
+
+class Test(unittest.TestCase):
+
+    def test(self):
+        from example1 import example_1
+        from example2 import example_2
+        from algos import value_iteration, interval_value_iteration, compute_v_of_policy
+        from telemetry import MemoryTelemetry
+
+        for mdp in [ example_1(), example_2() ]:
+            pol, vivalue = value_iteration(mdp=mdp, gamma=.9, epsilon=.000001)
+            telemetry = MemoryTelemetry()
+            ipol, lower, upper = interval_value_iteration(mdp, gamma=.9, epsilon=.01, telemetry=telemetry)
+            init = mdp.initial_state()
+            self.assertLess(upper.value(init) - lower.value(init), .01)
+            self.assertLess(telemetry.records()[-1].residual, .01)
+            for state in mdp.states():
+                self.assertLessEqual(lower.value(state), vivalue.value(state) + .00001)
+                self.assertGreaterEqual(upper.value(state), vivalue.value(state) - .00001)
+            # the value of the policy is certified by the lower bound
+            ipvalue = compute_v_of_policy(mdp, ipol, .9, .000001)
+            self.assertGreaterEqual(ipvalue.value(init), lower.value(init) - .01)
+
+            # all the states
+            _, lower, upper = interval_value_iteration(mdp, gamma=.9, epsilon=.01, states=mdp.states())
+            for state in mdp.states():
+                self.assertLess(upper.value(state) - lower.value(state), .01)
+
+        with self.assertRaises(ValueError):
+            interval_value_iteration(mdp, gamma=1, epsilon=.01)
+
+        # a state without applicable action has the value 0
+        from statemachine import SMMDP, SMTransition
+        chain = SMMDP([
+              SMTransition('0', 'a', [ ['1', 1, -1]]),
+              SMTransition('1', 'a', [ ['g', 1, -1]]),
+            ], '0'
+          )
+        _, lower, upper = interval_value_iteration(chain, gamma=.9, epsilon=.01, states=chain.states())
+        for name, value in [ ('0', -1.9), ('1', -1), ('g', 0) ]:
+            self.assertLessEqual(lower.value(chain.get_state(name)), value + .00001)
+            self.assertGreaterEqual(upper.value(chain.get_state(name)), value - .00001)
+            self.assertAlmostEqual(lower.value(chain.get_state(name)), value, delta=.01)
+
+def main():
+    unittest.main()
+
+if __name__ == "__main__":
+    main()
+
+# eof
@@ -8,11 +8,18 @@
   A (Markov, deterministic) policy is a dictionary State -> Action.
 '''
 
-from typing import Dict, Tuple, Optional, Set, List, FrozenSet
+from typing import Dict, Tuple, Optional, Set, List, FrozenSet, TYPE_CHECKING
 
+from heapq import heappush, heappop
+from itertools import count
 from random import random
+import warnings
 
 from MDP import Action, MDP, State, Policy, ExplicitPolicy, History
+from connectedcomp import compute_connected_components
+from telemetry import Telemetry, SolverMonitor
+if TYPE_CHECKING:
+    from checkpoint import Checkpoint # needs numpy, which is only required by some solvers
 
 #NOTE State Value Function: 可空定义，有set_value(s, v) 和 value(s)函数
 class StateValueFunction:
@@ -25,6 +32,7 @@ class StateValueFunction:
 class ExplicitStateValueFunction(StateValueFunction):
     '''
       A value function explicitly represented as a dictionary with default value of 0.
+      Reading the default value does not add it to the dictionary.
     '''
     def __init__(self, mdp: Optional[MDP] = None, value_function: Optional[StateValueFunction] = None):
         self._explicit_value = {}
@@ -36,22 +44,91 @@ class ExplicitStateValueFunction(StateValueFunction):
         self._explicit_value[s] = v
 
     def value(self, s: State): 
-        if not s in self._explicit_value:
-            self.set_value(s,0)
-        return self._explicit_value[s]
+        return self._explicit_value.get(s, 0)
 
-def state_value_difference(mdp: MDP, v1: StateValueFunction, v2: StateValueFunction) -> float:
+def state_value_difference(mdp: MDP, v1: StateValueFunction, v2: StateValueFunction, threshold: Optional[float] = None) -> float:
     '''
       Returns the absolute max difference between the two specified state value function.  
       This methods is particularly useful in contexts 
       in which one computes the state value function until convergence: 
       at each iteration, we compute the difference between the current value function and the previous one, 
       and we stop when that difference is below a given threshold.  
-      Notice however that this here method computes the value of the difference, 
-      whilst we only care about whether this difference is above the threshold;
-      in practice, we would probably send the threshold as a parameter and stop as soon as the threshold is reached.
+      If the threshold is specified, the method stops as soon as the threshold is reached 
+      (and then returns a difference that is not necessarily the max one).
+      Algorithms that compute the new value function state by state 
+      should rather use a ConvergenceCheck, which avoids the second traversal of the states.
     '''
-    return max([ abs(v1.value(s) - v2.value(s)) for s in mdp.states() ])
+    result = 0
+    for s in mdp.states():
+        result = max(result, abs(v1.value(s) - v2.value(s)))
+        if threshold != None and result >= threshold:
+            return result
+    return result
+
+#NOTE 收敛判断：在backup的过程中逐个state累计residual，不需要再遍历一次所有state
+STOPPING_RULES = ('difference', 'span', 'epsilon_optimal')
+
+class ConvergenceCheck:
+    '''
+      Decides whether an iterative algorithm has converged, 
+      from the residuals accumulated during the backup pass (cf. update).
+      The stopping rules are:
+      'difference': the max absolute difference between two successive value functions is below epsilon; 
+      'span': the span seminorm (max - min) of the difference is below epsilon; 
+      since the span ignores a constant shift of the values, 
+      this rule is a statement about the greedy policy rather than about the values 
+      (in particular, it stops after the first pass when all the states have the same difference, 
+      e.g., in an MDP with a single state, whatever the values); 
+      'epsilon_optimal': the max absolute difference is below epsilon (1 - gamma) / (2 gamma), 
+      which guarantees that the greedy policy is epsilon-optimal 
+      (with gamma = 0, a single backup is exact, so the threshold is infinite).
+    '''
+    def __init__(self, rule: str, epsilon: float, gamma: float):
+        if not rule in STOPPING_RULES:
+            raise ValueError(f'Unknown stopping rule {rule}, expected one of {STOPPING_RULES}')
+        self.rule_      = rule
+        if rule == 'epsilon_optimal':
+            self.threshold_ = float('inf') if gamma == 0 else epsilon * (1 - gamma) / (2 * gamma)
+        else:
+            self.threshold_ = epsilon
+        self.previous_  = None
+
+    def start(self, previous: StateValueFunction) -> None:
+        '''
+          Starts a new backup pass; previous is the value function before the pass.
+          If the backup is performed in place, update must be called before the value of the state is modified.
+        '''
+        self.previous_   = previous
+        self.max_diff_   = None
+        self.min_diff_   = None
+        self.nb_updates_ = 0
+
+    def update(self, s: State, v: float) -> None:
+        '''
+          Records the new value of the specified state.
+        '''
+        self.nb_updates_ += 1
+        diff = v - self.previous_.value(s)
+        if self.max_diff_ == None or self.max_diff_ < diff:
+            self.max_diff_ = diff
+        if self.min_diff_ == None or self.min_diff_ > diff:
+            self.min_diff_ = diff
+
+    def nb_updates(self) -> int:
+        '''
+          The number of states updated since the start of the pass.
+        '''
+        return self.nb_updates_
+
+    def residual(self) -> float:
+        if self.max_diff_ == None:
+            return 0
+        if self.rule_ == 'span':
+            return self.max_diff_ - self.min_diff_
+        return max(self.max_diff_, -self.min_diff_)
+
+    def converged(self) -> bool:
+        return self.residual() < self.threshold_
 
 #NOTE Action Value Function: 代表在s中执行a的value为多少。有set_value(s, a, v) 和 value(s, a)函数
 class ActionValueFunction:
@@ -72,13 +149,65 @@ class ExplicitActionValueFunction(ActionValueFunction):
         self._explicit_value[(s,a)] = v
 
     def value(self, s: State, a: Action): 
-        if not (s,a) in self._explicit_value:
-            self.set_value((s,a), 0)
-        return self._explicit_value[s,a]
+        return self._explicit_value.get((s,a), 0)
 
 #!------------------------------------------------------------------------------------------------------
+#NOTE (s , a) -> alias table，只在第一次使用时构建并检查概率分布
+class OutcomeSampler:
+    '''
+      A cache of samplers for the outcomes of the pairs state/action of an MDP.
+      The sampler of a pair is a Walker alias table built the first time the pair is sampled, 
+      so that each draw takes constant time whatever the number of successors.
+      The probability distribution is validated when the table is built.
+    '''
+    def __init__(self, mdp: MDP, tolerance: float = 1e-6):
+        self.mdp_       = mdp
+        self.tolerance_ = tolerance
+        self.tables_    = {} # (State, Action) -> (outcomes, probabilities, aliases)
+
+    def build_table(self, s: State, a: Action) -> Tuple[List[Tuple[State,float]], List[float], List[int]]:
+        '''
+          Builds the alias table of the specified pair (Vose's method).
+        '''
+        transitions = self.mdp_.next_states(s, a)
+        outcomes    = [ (next_s, rew) for next_s, _, rew in transitions ]
+        probs       = [ prob for _, prob, _ in transitions ]
+        total    = sum(probs)
+        if not outcomes or abs(total - 1) > self.tolerance_ or min(probs) < 0:
+            raise ValueError(f'Error with probability function {s} {a}: {probs}')
+
+        n       = len(probs)
+        scaled  = [ prob * n / total for prob in probs ]
+        aliases = list(range(n))
+        small   = [ i for i in range(n) if scaled[i] < 1 ]
+        large   = [ i for i in range(n) if scaled[i] >= 1 ]
+        while small and large:
+            i = small.pop()
+            j = large.pop()
+            aliases[i] = j
+            scaled[j] -= 1 - scaled[i]
+            if scaled[j] < 1:
+                small.append(j)
+            else:
+                large.append(j)
+        for i in small + large: # numerical leftovers
+            scaled[i] = 1
+        return outcomes, scaled, aliases
+
+    def sample(self, s: State, a: Action) -> Tuple[State,float]:
+        if not (s,a) in self.tables_:
+            self.tables_[(s,a)] = self.build_table(s, a)
+        outcomes, probs, aliases = self.tables_[(s,a)]
+        r = random() * len(outcomes)
+        i = int(r)
+        if r - i >= probs[i]:
+            i = aliases[i]
+        return outcomes[i]
+
 #NOTE (s , a) -> (s,' r)...
-def simulate_one_step(mdp: MDP, state: State, act: Action) -> Tuple[State,float]:
+def simulate_one_step(mdp: MDP, state: State, act: Action, sampler: Optional[OutcomeSampler] = None) -> Tuple[State,float]:
+    if sampler != None:
+        return sampler.sample(state, act)
     r = random()
     for next_state, prob, reward in mdp.next_states(state, act):
         r -= prob
@@ -87,12 +216,35 @@ def simulate_one_step(mdp: MDP, state: State, act: Action) -> Tuple[State,float]
     print(f'Error with probability function {state} {act}')
 
 #NOTE 从初始state开始，执行Policy上的指示，不停调用simulate_one_step来构建history
-def simulate(mdp: MDP, pol: Policy, nbsteps: int) -> History:
-    h = History(mdp)
+def simulate(mdp: MDP, pol: Policy, nbsteps: int, sampler: Optional[OutcomeSampler] = None, h: Optional[History] = None) -> History:
+    '''
+      Simulates nbsteps steps of the specified policy from the initial state.
+      The outcomes are drawn with the specified sampler cache (a new one by default).
+      The steps are added to the specified history if any (e.g., an ArrayHistory of history.py), 
+      and to a new History otherwise.
+    '''
+    sampler = OutcomeSampler(mdp) if sampler == None else sampler
+    h = History(mdp) if h == None else h
     for _ in range(nbsteps):
         current_state = h.last_state()
         act = pol.action(current_state)
-        next_state, rew = simulate_one_step(mdp, current_state, act)
+        next_state, rew = simulate_one_step(mdp, current_state, act, sampler)
+        h.add(act, next_state, rew)
+    return h
+
+#NOTE 有限horizon：policy依赖于时间，pol.action(s, t)
+def simulate_time_dependent(mdp: MDP, pol, nbsteps: int, sampler: Optional[OutcomeSampler] = None, h: Optional[History] = None) -> History:
+    '''
+      Simulates nbsteps steps of the specified time-dependent policy from the initial state: 
+      the action at step t is pol.action(s, t) (e.g., a vectorized.FiniteHorizonSolution).
+      The sampler and the history are as in simulate.
+    '''
+    sampler = OutcomeSampler(mdp) if sampler == None else sampler
+    h = History(mdp) if h == None else h
+    for t in range(nbsteps):
+        current_state = h.last_state()
+        act = pol.action(current_state, t)
+        next_state, rew = simulate_one_step(mdp, current_state, act, sampler)
         h.add(act, next_state, rew)
     return h
 
@@ -112,11 +264,20 @@ def greedy_action(mdp: MDP, q: ActionValueFunction, s: State) -> Tuple[Action,fl
     return best_action, best_val
 
 #NOTE 给Action Value Function，对每一个state调用greedy_action得到policy。返回policy与State Value Function
-def greedy_policy(mdp: MDP, q: ActionValueFunction) -> Tuple[Policy,StateValueFunction]:
+def greedy_policy(mdp: MDP, q: ActionValueFunction, check: Optional[ConvergenceCheck] = None) -> Tuple[Policy,StateValueFunction]:
     '''
       Computes the greedy policy associated with the specified action value function.  
       It also returns the associated state value function.
+      The new values are recorded in the convergence check, if any.
     '''
+    if hasattr(q, 'greedy_policy') and q.cmdp_ is mdp:
+        # array-backed action value function (cf. vectorized.py): the greedy policy is computed in bulk
+        result_pol, result_val = q.greedy_policy()
+        if check != None:
+            for s in mdp.states():
+                check.update(s, result_val.value(s))
+        return result_pol, result_val
+
     result_pol = ExplicitPolicy(mdp)
     result_val = ExplicitStateValueFunction()
     
@@ -124,6 +285,8 @@ def greedy_policy(mdp: MDP, q: ActionValueFunction) -> Tuple[Policy,StateValueFu
         action, val = greedy_action(mdp, q, s)
         result_pol.set_action(s, action)
         result_val.set_value(s, val)
+        if check != None:
+            check.update(s, val)
         
     return result_pol, result_val
 
@@ -134,12 +297,35 @@ def one_step_lookahead(mdp: MDP, v: StateValueFunction, gamma: float, s: State,
       Computes the one-step lookahead value for the specified pair state/action, given the specified state value function.
       The one-step lookahead is calculated by looking at all the possible states that can be reached from executing the action, 
       and adding their expected outcomes.
+      If the MDP is compiled (cf. compiled.py), the expected immediate reward is precomputed: 
+      the lookahead is R(s,a) + gamma sum_s' P(s,a,s') V(s').
     '''
+    if hasattr(mdp, 'reward_free_transitions'):
+        reward, transitions = mdp.reward_free_transitions(s, a)
+        expected_value = 0
+        for next_s, prob in transitions:
+            expected_value += prob * v.value(next_s)
+        return reward + gamma * expected_value
     value = 0
     for next_s, prob, rew in mdp.next_states(s,a):
         value += prob * (rew + (gamma * v.value(next_s)))
     return value
 
+#NOTE 对于state s，直接用one_step_lookahead贪婪地选择action，不构建Action Value Function
+def greedy_lookahead(mdp: MDP, v: StateValueFunction, gamma: float, s: State) -> Tuple[Action,float]:
+    '''
+      Computes the greedy action in the specified state given the one-step lookahead of the specified state value function.
+      The method returns both the action and its one-step lookahead value (None, None if no action is applicable).
+    '''
+    best_action = None
+    best_val    = None
+    for a in mdp.applicable_actions(s):
+        val = one_step_lookahead(mdp, v, gamma, s, a)
+        if best_val == None or best_val < val:
+            best_action = a
+            best_val    = val
+    return best_action, best_val
+
 #NOTE 给定state value function。计算action value function
 def compute_q_from_v(mdp: MDP, v: StateValueFunction, gamma: float) -> ActionValueFunction:
     '''
@@ -152,51 +338,143 @@ def compute_q_from_v(mdp: MDP, v: StateValueFunction, gamma: float) -> ActionVal
     return result
 
 #NOTE 给定action value function和policy。policy给出action，action value function给出action的值
-def compute_v_from_q_and_policy(mdp: MDP, pol: Policy, q: ActionValueFunction) -> StateValueFunction:
+def compute_v_from_q_and_policy(mdp: MDP, pol: Policy, q: ActionValueFunction, check: Optional[ConvergenceCheck] = None) -> StateValueFunction:
     '''
       Computes the state value function as a one-step lookahead value of the specified action value function 
       for the given policy.
+      The new values are recorded in the convergence check, if any.
     '''
     result = ExplicitStateValueFunction()
     for s in mdp.states():
-        result.set_value(s, q.value(s, pol.action(s)))
+        val = q.value(s, pol.action(s))
+        result.set_value(s, val)
+        if check != None:
+            check.update(s, val)
     return result
 
 #!------------------------------------------------------------------------------------------------------
 #NOTE 给定一个State Value Function，根据 “贪婪算法”   给出的action来更新 “一次” 那个State Value Function
-NB_BACKUPS = 0
-def bellman_backup(mdp: MDP, v: StateValueFunction, gamma: float) -> Tuple[Policy,StateValueFunction]:
+def bellman_backup(mdp: MDP, v: StateValueFunction, gamma: float, check: Optional[ConvergenceCheck] = None) -> Tuple[Policy,StateValueFunction]:
     '''
       Performs the Bellman backup for the specified state value function.
       Remember that the Bellamn backup is a greedy one-step lookahead of the existing state value function.
       This method also returns the current policy.
+      If a convergence check is specified, a new pass of this check is started from v.
     '''
-    global NB_BACKUPS
-    q = compute_q_from_v(mdp, v, gamma)
-    NB_BACKUPS += 1
-    return greedy_policy(mdp, q)
+    if check != None:
+        check.start(v)
+    # fused pass: the q values, the greedy action, the new value and the residual of a state 
+    # are computed together, without building the action value function of all the states
+    result_pol = ExplicitPolicy(mdp)
+    result_val = ExplicitStateValueFunction()
+    for s in mdp.states():
+        action, val = greedy_lookahead(mdp, v, gamma, s)
+        result_pol.set_action(s, action)
+        result_val.set_value(s, val)
+        if check != None:
+            check.update(s, val)
+    return result_pol, result_val
 
 #NOTE 给定一个State Value Function，根据 “特定policy” 给出的action来更新 “迭代n次” 那个State Value Function
 def compute_v_of_policy(mdp: MDP, \
     pol: Policy, \
     gamma: float, \
     stopping_threshold: float, \
-    starting_value: Optional[StateValueFunction] = None) -> StateValueFunction:
+    starting_value: Optional[StateValueFunction] = None, \
+    method: str = 'iterative', \
+    max_sweeps: Optional[int] = None, \
+    stopping_rule: str = 'difference', \
+    telemetry: Optional[Telemetry] = None) -> StateValueFunction:
     '''
       Computes iteratively the value of each state for the specified policy with the specified discount factor gamma.
-      The algorithm iteratively performs a backup until the backup change is below the specified stopping threshold.
+      The algorithm iteratively performs a backup until the backup change is below the specified stopping threshold,
+      or until max_sweeps backups have been performed (partial evaluation, cf. policy_iteration).
+      The change is measured according to the specified stopping rule (cf. ConvergenceCheck).
       The user can specify a starting state value function; starting with a good value function can decrease the number of required iterations.
-      (The result could also be computed as a system of linear equations.)
+      The result can also be computed as a system of linear equations (cf. solve_v_of_policy)
+      by setting method to 'direct' or 'krylov'.
+      Each sweep (or the linear solve) is reported to the telemetry sink, if any.
     '''
+    monitor = SolverMonitor('compute_v_of_policy', mdp, telemetry)
+    mdp     = monitor.mdp()
+    if method != 'iterative':
+        result = solve_v_of_policy(mdp, pol, gamma, stopping_threshold, starting_value, method)
+        monitor.iteration(0, len(mdp.states()))
+        return result
     current_svalue: StateValueFunction = ExplicitStateValueFunction() if starting_value == None else starting_value
+    check     = ConvergenceCheck(stopping_rule, stopping_threshold, gamma)
+    nb_sweeps = 0
     while True: # could bound the number of iterations
         qvalue     = compute_q_from_v(mdp, current_svalue, gamma)
-        new_svalue = compute_v_from_q_and_policy(mdp, pol, qvalue)
-        diff       = state_value_difference(mdp, current_svalue, new_svalue)
-        if diff < stopping_threshold:
+        check.start(current_svalue)
+        new_svalue = compute_v_from_q_and_policy(mdp, pol, qvalue, check)
+        nb_sweeps += 1
+        monitor.iteration(check.residual(), check.nb_updates())
+        if max_sweeps != None and nb_sweeps >= max_sweeps:
+            return new_svalue
+        if check.converged():
             return new_svalue
         current_svalue = new_svalue
 
+#NOTE 直接求解线性方程组 (I - gamma * P_pi) V = R_pi
+def solve_v_of_policy(mdp: MDP, \
+    pol: Policy, \
+    gamma: float, \
+    stopping_threshold: float, \
+    starting_value: Optional[StateValueFunction] = None, \
+    method: str = 'direct') -> StateValueFunction:
+    '''
+      Computes the value of each state for the specified policy 
+      by solving the linear system (I - gamma P_pi) V = R_pi, 
+      where P_pi is the (sparse) transition matrix induced by the policy 
+      and R_pi the expected immediate reward of each state.
+      'direct' uses a sparse LU factorisation; 
+      'krylov' uses an iterative Krylov solver (BiCGSTAB) 
+      that starts from starting_value and stops when the residual is small enough 
+      for the value to be within stopping_threshold 
+      (a RuntimeWarning is issued if it does not converge, and the value may then be imprecise).
+    '''
+    import numpy as np # pip install numpy scipy
+    from scipy.sparse import csr_matrix, identity
+    from scipy.sparse.linalg import splu, bicgstab
+
+    if not method in ('direct', 'krylov'):
+        raise ValueError(f'Unknown method {method}, expected iterative, direct or krylov')
+
+    states = list(mdp.states())
+    index  = { s : i for i, s in enumerate(states) }
+    rows, cols, probs = [], [], []
+    rewards = []
+    for i in range(len(states)): # states may grow if some successors are not listed in mdp.states()
+        s = states[i]
+        expected_reward = 0
+        for next_s, prob, rew in mdp.next_states(s, pol.action(s)):
+            if not next_s in index:
+                index[next_s] = len(states)
+                states.append(next_s)
+            rows.append(i)
+            cols.append(index[next_s])
+            probs.append(prob)
+            expected_reward += prob * rew
+        rewards.append(expected_reward)
+
+    n      = len(states)
+    matrix = (identity(n, format='csc') - gamma * csr_matrix((probs, (rows, cols)), shape=(n, n))).tocsc()
+    rhs    = np.array(rewards, dtype=np.float64)
+    if method == 'direct':
+        values = splu(matrix).solve(rhs)
+    else:
+        x0 = None if starting_value is None else np.array([ starting_value.value(s) for s in states ], dtype=np.float64)
+        # ||V - V*|| <= ||residual|| / (1 - gamma)
+        values, info = bicgstab(matrix, rhs, x0=x0, rtol=0, atol=stopping_threshold * (1 - gamma))
+        if info != 0:
+            warnings.warn(f'Krylov solver did not converge ({info}), the value may be imprecise', RuntimeWarning)
+
+    result = ExplicitStateValueFunction()
+    for s, v in zip(states, values):
+        result.set_value(s, float(v))
+    return result
+
 #!------------------------------------------------------------------------------------------------------
 #NOTE 对于那个policy，测试它是否在每一个state上选择的action的value都近似==贪婪算法的选择的值
 def is_policy_nearly_greedy(mdp: MDP, pol: Policy, epsilon: float, q: ActionValueFunction):
@@ -213,33 +491,419 @@ def is_policy_nearly_greedy(mdp: MDP, pol: Policy, epsilon: float, q: ActionValu
             return False
     return True
 
-def policy_iteration(mdp: MDP, gamma: float, epsilon: float, stopping_threshold: float, starting_pi: Optional[Policy] = None) -> Policy:
+#NOTE 两个policy是否在每一个state上选择相同的action
+def same_policy(mdp: MDP, pol1: Policy, pol2: Policy) -> bool:
+    '''
+      Indicates whether the two specified policies select the same action in every state.
+    '''
+    for s in mdp.states():
+        if pol1.action(s) != pol2.action(s):
+            return False
+    return True
+
+def policy_iteration(mdp: MDP, gamma: float, epsilon: float, stopping_threshold: float, starting_pi: Optional[Policy] = None, method: str = 'iterative', nb_sweeps: Optional[int] = None, telemetry: Optional[Telemetry] = None, checkpoint: Optional['Checkpoint'] = None, resume: bool = False) -> Policy:
     '''
       Performs the policy iteration algorithm.
       epsilon is used to determine when a policy is nearly optimal (cf. subroutine is_policy_nearly_greedy).
       stopping_threshold is used to determine when the value of a policy is precise enough (cf. policy compute_v_of_policy).
+      method is the policy evaluation method (cf. compute_v_of_policy).
+      The evaluation of each policy starts from the value of the previous policy.
+      If nb_sweeps is specified, the algorithm performs modified policy iteration: 
+      each policy is only partially evaluated with nb_sweeps iterative backups 
+      (method must then be 'iterative').
+      The algorithm also stops when the greedy policy is the current policy (policy stability).
+      In the case of partial evaluations, both tests are only performed 
+      once the Bellman residual of the value is below stopping_threshold.
+      Each improvement step is reported to the telemetry sink, if any, with the Bellman residual of the evaluated value; 
+      the evaluations are reported as well (cf. compute_v_of_policy).
+      If a checkpoint is specified, the policy and its value are saved after the improvement steps (cf. Checkpoint), 
+      and if resume is set, the algorithm restarts from the saved policy and value (if the checkpoint exists).
+      A new run can also be warm-started from the policy of a checkpoint with starting_pi=checkpoint.load_policy(mdp).
     '''
-    pol = ExplicitPolicy(mdp) if starting_pi == None else starting_pi 
+    if nb_sweeps != None and method != 'iterative':
+        raise ValueError(f'Modified policy iteration (nb_sweeps={nb_sweeps}) evaluates the policies iteratively, it can not use the method {method}')
+    monitor   = SolverMonitor('policy_iteration', mdp, telemetry)
+    mdp       = monitor.mdp()
+    pol       = ExplicitPolicy(mdp) if starting_pi == None else starting_pi 
+    vs        = None
+    iteration = 0
+    if resume and checkpoint != None and checkpoint.exists():
+        pol       = checkpoint.load_policy(mdp)
+        vs        = checkpoint.load_values(mdp)
+        iteration = checkpoint.iteration()
     while True:
-        vs = compute_v_of_policy(mdp, pol, gamma, stopping_threshold)
+        if nb_sweeps == None:
+            vs = compute_v_of_policy(mdp, pol, gamma, stopping_threshold, starting_value=vs, method=method, telemetry=telemetry)
+        else:
+            vs = compute_v_of_policy(mdp, pol, gamma, stopping_threshold, starting_value=vs, max_sweeps=nb_sweeps, telemetry=telemetry)
         qs = compute_q_from_v(mdp, vs, gamma)
-        if is_policy_nearly_greedy(mdp, pol, epsilon, qs):
-            return pol
-        pol, vs = greedy_policy(mdp, qs)
+        new_pol, greedy_vs = greedy_policy(mdp, qs)
+        if monitor.active():
+            monitor.iteration(state_value_difference(mdp, vs, greedy_vs), len(mdp.states()))
+        # a partially evaluated value can not be trusted before the Bellman residual is small enough
+        if nb_sweeps == None or state_value_difference(mdp, vs, greedy_vs, stopping_threshold) < stopping_threshold:
+            if is_policy_nearly_greedy(mdp, pol, epsilon, qs) or same_policy(mdp, pol, new_pol):
+                if checkpoint != None:
+                    checkpoint.save(mdp, 'policy_iteration', iteration, vs, pol, converged=True)
+                return pol
+        pol        = new_pol
+        iteration += 1
+        if checkpoint != None and checkpoint.due(iteration):
+            checkpoint.save(mdp, 'policy_iteration', iteration, vs, pol)
 
 #NOTE 不断的执行bellman backup，效果等于compute_v_of_policy。
-def value_iteration(mdp: MDP, gamma: float, epsilon: float) -> Tuple[Policy, StateValueFunction]:
+def value_iteration(mdp: MDP, gamma: float, epsilon: float, in_place: bool = False, sweep_order: str = 'insertion', stopping_rule: str = 'difference', telemetry: Optional[Telemetry] = None, \
+    starting_value: Optional[StateValueFunction] = None, checkpoint: Optional['Checkpoint'] = None, resume: bool = False, \
+    eliminate_actions: bool = False) -> Tuple[Policy, StateValueFunction]:
     '''
       Performs the value iteration algorithm.
+      If in_place is set, the algorithm performs Gauss-Seidel sweeps (cf. in_place_value_iteration) 
+      in the specified order (cf. compute_sweep_order).
+      If eliminate_actions is set, the actions that are provably suboptimal are not backed up anymore 
+      (cf. action_elimination_value_iteration, which also returns the eliminated actions); 
+      this is not compatible with in_place.
+      The algorithm stops according to the specified stopping rule (cf. ConvergenceCheck).
+      Each iteration is reported to the telemetry sink, if any.
+      The algorithm starts from starting_value, if specified 
+      (e.g., to warm-start a new run from a checkpoint: starting_value=checkpoint.load_values(mdp)).
+      If a checkpoint is specified, the value and the policy are saved periodically (cf. Checkpoint), 
+      and if resume is set, the algorithm restarts from the saved value and iteration counter (if the checkpoint exists).
     '''
-    vs = ExplicitStateValueFunction()
+    check = ConvergenceCheck(stopping_rule, epsilon, gamma)
+    if eliminate_actions:
+        if in_place:
+            raise ValueError('Action elimination is only available with Jacobi (not in place) sweeps')
+        pol, vs, _ = action_elimination_value_iteration(mdp, gamma, epsilon, check, telemetry, starting_value, checkpoint, resume)
+        return pol, vs
+    if in_place:
+        return in_place_value_iteration(mdp, gamma, epsilon, compute_sweep_order(mdp, sweep_order), check, telemetry, starting_value, checkpoint, resume)
+    monitor       = SolverMonitor('value_iteration', mdp, telemetry)
+    mdp           = monitor.mdp()
+    vs, iteration = restore_values(mdp, starting_value, checkpoint, resume)
     while True:
-        pol, newvs = bellman_backup(mdp, vs, gamma)
-        diff = state_value_difference(mdp, vs, newvs)
-        if diff < epsilon:
+        pol, newvs = bellman_backup(mdp, vs, gamma, check)
+        iteration += 1
+        monitor.iteration(check.residual(), check.nb_updates())
+        if check.converged():
+            if checkpoint != None:
+                checkpoint.save(mdp, 'value_iteration', iteration, newvs, pol, converged=True)
             return pol, newvs
+        if checkpoint != None and checkpoint.due(iteration):
+            checkpoint.save(mdp, 'value_iteration', iteration, newvs, pol)
         vs = newvs
 
+def restore_values(mdp: MDP, starting_value: Optional[StateValueFunction], checkpoint: Optional['Checkpoint'], resume: bool) -> Tuple[StateValueFunction, int]:
+    '''
+      The value function from which value iteration starts, and the number of iterations already performed: 
+      the value saved in the checkpoint if resume is set and the checkpoint exists, 
+      a copy of starting_value if it is specified, and 0 otherwise.
+    '''
+    if resume and checkpoint != None and checkpoint.exists():
+        return checkpoint.load_values(mdp), checkpoint.iteration()
+    if starting_value != None:
+        return ExplicitStateValueFunction(mdp, starting_value), 0
+    return ExplicitStateValueFunction(), 0
+
+#!------------------------------------------------------------------------------------------------------
+#NOTE 访问state的顺序：insertion = mdp.states()，reverse_bfs = 从initial state开始BFS的逆序，scc = 从叶子SCC到根SCC
+SWEEP_ORDERS = ('insertion', 'reverse_bfs', 'scc')
+
+def compute_sweep_order(mdp: MDP, order: str) -> List[State]:
+    '''
+      Computes the order in which the states are backed up during an in-place sweep.
+      'insertion' is the order of mdp.states(); 
+      'reverse_bfs' is the reverse of a breadth first exploration from the initial state; 
+      'scc' lists the strongly connected components in reverse topological order (the leaves first), 
+      so that the successors of a component are backed up before the component itself.
+      The states that are not reachable from the initial state are backed up last.
+    '''
+    if not order in SWEEP_ORDERS:
+        raise ValueError(f'Unknown sweep order {order}, expected one of {SWEEP_ORDERS}')
+    if order == 'insertion':
+        return list(mdp.states())
 
+    result = []
+    if order == 'reverse_bfs':
+        known = { mdp.initial_state() }
+        result.append(mdp.initial_state())
+        i = 0
+        while i < len(result):
+            state = result[i]
+            i += 1
+            for act in mdp.applicable_actions(state):
+                for next_state, _, _ in mdp.next_states(state, act):
+                    if not next_state in known:
+                        known.add(next_state)
+                        result.append(next_state)
+        result.reverse()
+    else:
+        # post-order traversal of the graph of components
+        graph = compute_connected_components(mdp)
+        done  = set()
+        for root in graph.roots():
+            if root in done:
+                continue
+            done.add(root)
+            stack = [(root, iter(root.children()))]
+            while stack:
+                cc, children = stack[-1]
+                child = next(children, None)
+                if child is None:
+                    stack.pop()
+                    result.extend(cc.states())
+                elif not child in done:
+                    done.add(child)
+                    stack.append((child, iter(child.children())))
+
+    reached = set(result)
+    result.extend([ s for s in mdp.states() if not s in reached ])
+    return result
+
+#NOTE Gauss-Seidel：只保留一个State Value Function，每个state的backup直接使用本轮已经更新过的值
+def in_place_value_iteration(mdp: MDP, gamma: float, epsilon: float, order: List[State], check: Optional[ConvergenceCheck] = None, telemetry: Optional[Telemetry] = None, \
+    starting_value: Optional[StateValueFunction] = None, checkpoint: Optional['Checkpoint'] = None, resume: bool = False) -> Tuple[Policy, StateValueFunction]:
+    '''
+      Performs the value iteration algorithm with in-place (Gauss-Seidel) sweeps: 
+      the states are backed up in the specified order, 
+      and each backup uses the values already updated earlier in the same sweep.
+      Only one state value function is kept.
+      By default, the algorithm stops when no value changes by epsilon or more during a sweep.
+      Each sweep is reported to the telemetry sink, if any.
+      The starting value and the checkpoint are handled as in value_iteration (starting_value is not modified).
+    '''
+    monitor       = SolverMonitor('value_iteration', mdp, telemetry)
+    mdp           = monitor.mdp()
+    check         = ConvergenceCheck('difference', epsilon, gamma) if check == None else check
+    pol           = ExplicitPolicy(mdp)
+    vs, iteration = restore_values(mdp, starting_value, checkpoint, resume)
+    while True:
+        check.start(vs)
+        for s in order:
+            best_action, best_val = greedy_lookahead(mdp, vs, gamma, s)
+            if best_action is None:
+                continue
+            check.update(s, best_val)
+            vs.set_value(s, best_val)
+            pol.set_action(s, best_action)
+        iteration += 1
+        monitor.iteration(check.residual(), check.nb_updates())
+        if check.converged():
+            if checkpoint != None:
+                checkpoint.save(mdp, 'value_iteration', iteration, vs, pol, converged=True)
+            return pol, vs
+        if checkpoint != None and checkpoint.due(iteration):
+            checkpoint.save(mdp, 'value_iteration', iteration, vs, pol)
+
+#!------------------------------------------------------------------------------------------------------
+#NOTE predecessor index: s' -> 所有可以一步到达s'的state
+def compute_predecessors(mdp: MDP) -> Dict[State, Set[State]]:
+    '''
+      Computes, for each state, the set of states from which it can be reached in one step.
+    '''
+    result = { s : set() for s in mdp.states() }
+    for s in mdp.states():
+        for a in mdp.applicable_actions(s):
+            for next_s, _, _ in mdp.next_states(s, a):
+                if not next_s in result:
+                    result[next_s] = set()
+                result[next_s].add(s)
+    return result
+
+#NOTE 优先队列按Bellman residual排序，只有发生变化的state的predecessor才会被重新放入队列
+def prioritized_sweeping(mdp: MDP, gamma: float, epsilon: float, predecessors: Optional[Dict[State, Set[State]]] = None, \
+    starting_value: Optional[StateValueFunction] = None, seeds: Optional[List[State]] = None, starting_pi: Optional[Policy] = None) -> Tuple[Policy, StateValueFunction]:
+    '''
+      Performs value iteration with prioritized sweeping.
+      The states are backed up one at a time, by decreasing Bellman residual.
+      When the value of a state changes, only its predecessors (cf. compute_predecessors) are re-examined.
+      The algorithm stops when the largest residual in the queue is below epsilon.
+      The predecessor index can be given if it has already been computed.
+      The algorithm starts from starting_value if specified (it is not modified), 
+      and initially examines the states in seeds (all the states by default).
+      If starting_pi is specified, the states that have not been backed up keep their action in starting_pi 
+      (cf. incremental_value_iteration).
+    '''
+    preds    = compute_predecessors(mdp) if predecessors is None else predecessors
+    vs       = ExplicitStateValueFunction() if starting_value is None else ExplicitStateValueFunction(mdp, starting_value)
+    updated  = set()
+    queue    = [] # heap of (-residual, tie breaker, state)
+    priority = {} # State -> residual of its most recent entry in the queue
+    tie      = count()
+
+    def push(s: State) -> None:
+        _, val = greedy_lookahead(mdp, vs, gamma, s)
+        if val is None:
+            return
+        residual = abs(val - vs.value(s))
+        if residual >= epsilon and residual > priority.get(s, 0):
+            priority[s] = residual
+            heappush(queue, (-residual, next(tie), s))
+
+    for s in (mdp.states() if seeds is None else seeds):
+        push(s)
+
+    while queue:
+        neg_residual, _, s = heappop(queue)
+        if priority.get(s) != -neg_residual:
+            continue # outdated entry
+        del priority[s]
+        _, val = greedy_lookahead(mdp, vs, gamma, s)
+        vs.set_value(s, val)
+        updated.add(s)
+        for pred in preds.get(s, ()):
+            push(pred)
+
+    pol = ExplicitPolicy(mdp)
+    for s in mdp.states():
+        if starting_pi != None and not s in updated:
+            if len(mdp.applicable_actions(s)) > 0:
+                pol.set_action(s, starting_pi.action(s))
+            continue
+        action, _ = greedy_lookahead(mdp, vs, gamma, s)
+        if not action is None:
+            pol.set_action(s, action)
+    return pol, vs
+
+#NOTE 模型被小幅修改之后，从之前的value function开始，只重新计算受影响的state
+def incremental_value_iteration(mdp: MDP, gamma: float, epsilon: float, previous_value: StateValueFunction, modified: List[Tuple[State, Action]], \
+    previous_pi: Optional[Policy] = None, predecessors: Optional[Dict[State, Set[State]]] = None) -> Tuple[Policy, StateValueFunction]:
+    '''
+      Re-solves the MDP after the transitions of a few (state, action) pairs have been modified, 
+      starting from previous_value, the value computed (with the same gamma and epsilon) before the modifications.
+      Only the Bellman residuals of the states of the modified pairs can have changed, 
+      so the worklist is seeded with these states, and the changes are propagated to their ancestors 
+      through the predecessor index (cf. prioritized_sweeping).
+      A new state should be listed in modified with its applicable actions.
+      The predecessor index of the MDP before the modifications can be given; 
+      it is then updated in place with the new transitions of the modified pairs 
+      (the removed transitions are kept, which only costs spurious re-examinations).
+      The states that are not backed up keep their action in previous_pi, if specified.
+    '''
+    preds = compute_predecessors(mdp) if predecessors is None else predecessors
+    for s, a in modified:
+        for next_s, _, _ in mdp.next_states(s, a):
+            if not next_s in preds:
+                preds[next_s] = set()
+            preds[next_s].add(s)
+    seeds = list(dict.fromkeys(s for s, _ in modified))
+    return prioritized_sweeping(mdp, gamma, epsilon, preds, previous_value, seeds, previous_pi)
+
+#!------------------------------------------------------------------------------------------------------
+#NOTE action elimination: 根据V*的上下界，永久删除可以证明不是最优的action
+def action_elimination_value_iteration(mdp: MDP, gamma: float, epsilon: float, check: Optional[ConvergenceCheck] = None, telemetry: Optional[Telemetry] = None, \
+    starting_value: Optional[StateValueFunction] = None, checkpoint: Optional['Checkpoint'] = None, resume: bool = False) -> Tuple[Policy, StateValueFunction, Dict[State, Set[Action]]]:
+    '''
+      Performs the value iteration algorithm, permanently eliminating the actions that are provably suboptimal.
+      If the max change of the values during a backup is delta, the optimal value V* is within 
+      gamma delta / (1 - gamma) of the new values (lower and upper bounds of V*), 
+      so the Q values computed from the new values are within w = gamma^2 delta / (1 - gamma) of Q*.
+      An action a is eliminated in state s when its upper bound Q(s,a) + w 
+      is below the lower bound max_b Q(s,b) - w of another action: it can not be optimal.
+      Only the remaining actions are backed up, which does not change the optimal value.
+      Requires gamma < 1 (otherwise no action is eliminated).
+      Returns the policy, the value, and the set of the actions eliminated in each state.
+      The other arguments are as in value_iteration.
+    '''
+    monitor       = SolverMonitor('value_iteration', mdp, telemetry)
+    mdp           = monitor.mdp()
+    check         = ConvergenceCheck('difference', epsilon, gamma) if check == None else check
+    remaining     = { s : list(mdp.applicable_actions(s)) for s in mdp.states() }
+    eliminated    = { s : set() for s in mdp.states() }
+    vs, iteration = restore_values(mdp, starting_value, checkpoint, resume)
+    width         = None # the max distance between the Q values and Q*, unknown before the first backup
+    while True:
+        check.start(vs)
+        pol   = ExplicitPolicy(mdp)
+        newvs = ExplicitStateValueFunction()
+        delta = 0
+        for s in mdp.states():
+            qs = [ (a, one_step_lookahead(mdp, vs, gamma, s, a)) for a in remaining[s] ]
+            if len(qs) == 0:
+                continue
+            best_action, best_val = qs[0]
+            for a, val in qs:
+                if best_val < val:
+                    best_action, best_val = a, val
+            if width != None:
+                for a, val in qs:
+                    if val + width < best_val - width:
+                        eliminated[s].add(a)
+                if len(eliminated[s]) > 0:
+                    remaining[s] = [ a for a in remaining[s] if not a in eliminated[s] ]
+            pol.set_action(s, best_action)
+            newvs.set_value(s, best_val)
+            check.update(s, best_val)
+            delta = max(delta, abs(best_val - vs.value(s)))
+        iteration += 1
+        monitor.iteration(check.residual(), check.nb_updates())
+        if check.converged():
+            if checkpoint != None:
+                checkpoint.save(mdp, 'value_iteration', iteration, newvs, pol, converged=True)
+            return pol, newvs, eliminated
+        if checkpoint != None and checkpoint.due(iteration):
+            checkpoint.save(mdp, 'value_iteration', iteration, newvs, pol)
+        if gamma < 1:
+            width = gamma * gamma * delta / (1 - gamma)
+        vs = newvs
+
+#!------------------------------------------------------------------------------------------------------
+#NOTE interval VI: 同时迭代V*的下界和上界，当指定的state的上下界足够接近时停止
+def interval_value_iteration(mdp: MDP, gamma: float, epsilon: float, states: Optional[List[State]] = None, telemetry: Optional[Telemetry] = None) -> Tuple[Policy, StateValueFunction, StateValueFunction]:
+    '''
+      Performs value iteration on a lower bound and an upper bound of the optimal value at the same time.
+      The bounds start at min(rmin, 0) / (1 - gamma) and max(rmax, 0) / (1 - gamma), where rmin and rmax are the extreme rewards of the MDP 
+      (the states without applicable action have the value 0, so both of their bounds are 0); 
+      since the Bellman backup is monotone, the lower bound then only increases and the upper bound only decreases, 
+      and the optimal value always lies between them.
+      The algorithm stops as soon as the gap between the bounds is below epsilon in all the specified states 
+      (by default, only the initial state), which certifies the value of these states.
+      Returns the greedy policy of the lower bound (whose value is at least the lower bound of the previous iteration), 
+      the lower bound and the upper bound.
+      Each iteration is reported to the telemetry sink, if any, with the max gap over the specified states as residual.
+      Requires gamma < 1.
+    '''
+    if not 0 <= gamma < 1:
+        raise ValueError(f'Interval value iteration requires a discount factor in [0,1), got {gamma}')
+    monitor = SolverMonitor('interval_value_iteration', mdp, telemetry)
+    mdp     = monitor.mdp()
+    states  = [ mdp.initial_state() ] if states == None else states
+    rewards = [ rew for s in mdp.states() for a in mdp.applicable_actions(s) for _, _, rew in mdp.next_states(s, a) ]
+    lower   = ExplicitStateValueFunction()
+    upper   = ExplicitStateValueFunction()
+    for s in mdp.states():
+        with_actions = len(mdp.applicable_actions(s)) > 0
+        lower.set_value(s, min(min(rewards, default=0), 0) / (1 - gamma) if with_actions else 0)
+        upper.set_value(s, max(max(rewards, default=0), 0) / (1 - gamma) if with_actions else 0)
+    while True:
+        pol      = ExplicitPolicy(mdp)
+        newlower = ExplicitStateValueFunction()
+        newupper = ExplicitStateValueFunction()
+        for s in mdp.states():
+            best_action = None
+            best_low    = None
+            best_up     = None
+            for a in mdp.applicable_actions(s):
+                # both lookaheads share the traversal of the outcomes
+                low = up = 0
+                for next_s, prob, rew in mdp.next_states(s, a):
+                    low += prob * (rew + gamma * lower.value(next_s))
+                    up  += prob * (rew + gamma * upper.value(next_s))
+                if best_low == None or best_low < low:
+                    best_action = a
+                    best_low    = low
+                if best_up == None or best_up < up:
+                    best_up     = up
+            if best_action is None:
+                newlower.set_value(s, 0)
+                newupper.set_value(s, 0)
+                continue
+            pol.set_action(s, best_action)
+            newlower.set_value(s, best_low)
+            newupper.set_value(s, best_up)
+        lower, upper = newlower, newupper
+        gap = max(upper.value(s) - lower.value(s) for s in states)
+        monitor.iteration(gap, len(mdp.states()))
+        if gap < epsilon:
+            return pol, lower, upper
 
 # eof
\ No newline at end of file
@@ -0,0 +1,29 @@
+import unittest
+
+class Test(unittest.TestCase):
+
+    def test(self):
+        from benchmark import random_state_machine, run_benchmark
+
+        mdp = random_state_machine(50, branching=3, nb_actions=2, cycle_density=.3, seed=0)
+        self.assertEqual(len(mdp.states()), 50)
+        for s in mdp.states():
+            self.assertEqual(len(mdp.applicable_actions(s)), 2)
+            for a in mdp.applicable_actions(s):
+                self.assertLessEqual(len(mdp.next_states(s, a)), 3)
+                self.assertAlmostEqual(sum(p for _, p, _ in mdp.next_states(s, a)), 1)
+
+        results = run_benchmark([ 50 ], [ 'value_iteration', 'vectorized_value_iteration', 'compute_non_augmentable_policy' ])
+        random_results = { r['solver'] : r for r in results if r['model'].startswith('random') }
+        self.assertEqual(random_results['value_iteration']['status'], 'ok')
+        self.assertEqual(random_results['compute_non_augmentable_policy']['status'], 'skipped')
+        self.assertAlmostEqual(random_results['value_iteration']['initial_value'],
+                               random_results['vectorized_value_iteration']['initial_value'])
+
+def main():
+    unittest.main()
+
+if __name__ == "__main__":
+    main()
+
+# eof
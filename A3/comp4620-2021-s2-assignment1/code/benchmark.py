@@ -0,0 +1,162 @@
+'''
+  Planning benchmark: times the solvers on scalable synthetic MDPs and on the example models.
+
+  Usage: python benchmark.py [--sizes 100 1000 ...] [--solvers value_iteration ...] [--json results.json]
+
+  The results are printed as a table and can be saved as JSON, to track scaling regressions.
+'''
+
+import argparse
+import json
+import random
+import sys
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from MDP import MDP
+from statemachine import SMMDP, SMTransition
+
+def random_state_machine(nb_states: int, branching: int, nb_actions: int, cycle_density: float, seed: Optional[int] = None) -> SMMDP:
+    '''
+      Generates a random sparse state machine MDP with states '0' .. 'nb_states-1' (the initial state is '0').
+      Each state has nb_actions actions, and each action has (at most) branching successors
+      with random probabilities and rewards in [0,10).
+      A successor is a previous state (which creates cycles) with probability cycle_density,
+      and a later state otherwise; the last state only loops on itself.
+    '''
+    rng = random.Random(seed)
+    transitions = []
+    for i in range(nb_states):
+        for a in range(nb_actions):
+            successors = {}
+            for _ in range(branching):
+                if i == nb_states - 1:
+                    succ = i
+                elif i > 0 and rng.random() < cycle_density:
+                    succ = rng.randrange(0, i)
+                else:
+                    succ = rng.randrange(i + 1, nb_states)
+                successors[succ] = successors.get(succ, 0) + rng.random()
+            total = sum(successors.values())
+            transitions.append(SMTransition(str(i), f'a{a}', [ [str(succ), weight / total, rng.random() * 10] for succ, weight in successors.items() ]))
+    return SMMDP(transitions, '0')
+
+def nb_transitions(mdp: MDP) -> int:
+    return sum(len(mdp.next_states(s, a)) for s in mdp.states() for a in mdp.applicable_actions(s))
+
+def run_value_iteration(mdp: MDP, gamma: float, epsilon: float) -> float:
+    from algos import value_iteration
+    _, value = value_iteration(mdp, gamma, epsilon)
+    return value.value(mdp.initial_state())
+
+def run_vectorized_value_iteration(mdp: MDP, gamma: float, epsilon: float) -> float:
+    from vectorized import vectorized_value_iteration
+    _, value = vectorized_value_iteration(mdp, gamma, epsilon)
+    return value.value(mdp.initial_state())
+
+def run_policy_iteration(mdp: MDP, gamma: float, epsilon: float) -> float:
+    from algos import policy_iteration, compute_v_of_policy
+    pol = policy_iteration(mdp, gamma, epsilon, epsilon)
+    return compute_v_of_policy(mdp, pol, gamma, epsilon).value(mdp.initial_state())
+
+def run_topological_vi(mdp: MDP, gamma: float, epsilon: float) -> float:
+    from connectedcomp import compute_connected_components
+    from top import topological_vi
+    return topological_vi(mdp, gamma, epsilon, compute_connected_components(mdp)).value(mdp.initial_state())
+
+def run_compute_non_augmentable_policy(mdp: MDP, gamma: float, epsilon: float) -> float:
+    from nondet import compute_non_augmentable_policy, compute_policy_value
+    ndpol = compute_non_augmentable_policy(mdp, gamma, epsilon, subopt_epsilon=.03, max_iteration=1000)
+    return compute_policy_value(mdp, ndpol, gamma, epsilon, max_iteration=1000).value(mdp.initial_state())
+
+#NOTE 每个solver: (运行函数, 可以处理的最大state数量)
+SOLVERS: Dict[str, Tuple[Callable[[MDP, float, float], float], int]] = {
+    'value_iteration'                : (run_value_iteration,                10**5),
+    'vectorized_value_iteration'     : (run_vectorized_value_iteration,     10**6),
+    'policy_iteration'               : (run_policy_iteration,               10**4),
+    'topological_vi'                 : (run_topological_vi,                 10**4), # recursive DFS in connectedcomp
+    'compute_non_augmentable_policy' : (run_compute_non_augmentable_policy, 10),    # exponential search
+}
+
+def benchmark_models(sizes: List[int], branching: int, nb_actions: int, cycle_density: float, seed: int) -> List[Tuple[str, Callable[[], MDP]]]:
+    '''
+      The models of the benchmark, as (name, constructor) pairs.
+    '''
+    from example1 import example_1
+    from example2 import example_2
+    from map import basic_map, basic_map2, DungeonMDP
+    models = [
+        ('example_1',           example_1),
+        ('example_2',           example_2),
+        ('dungeon(basic_map)',  lambda: DungeonMDP(basic_map())),
+        ('dungeon(basic_map2)', lambda: DungeonMDP(basic_map2())),
+    ]
+    for size in sizes:
+        models.append((f'random({size},{branching},{nb_actions},{cycle_density})',
+                       lambda size=size: random_state_machine(size, branching, nb_actions, cycle_density, seed)))
+    return models
+
+def run_benchmark(sizes: List[int], solvers: List[str], gamma: float = .9, epsilon: float = .01,
+                  branching: int = 3, nb_actions: int = 2, cycle_density: float = .2, seed: int = 0) -> List[Dict[str, Any]]:
+    '''
+      Times each solver on each model and returns one result per pair model/solver.
+      A solver is skipped on the models with more states than it can handle (cf. SOLVERS);
+      the failure of a solver is reported in the status of the result.
+    '''
+    results = []
+    for name, make_model in benchmark_models(sizes, branching, nb_actions, cycle_density, seed):
+        start = time.perf_counter()
+        mdp   = make_model()
+        nb_states = len(mdp.states())
+        build_time = time.perf_counter() - start
+        nb_trans  = nb_transitions(mdp)
+        for solver in solvers:
+            run, max_states = SOLVERS[solver]
+            result = { 'model': name, 'nb_states': nb_states, 'nb_transitions': nb_trans, 'build_time': build_time,
+                       'solver': solver, 'gamma': gamma, 'epsilon': epsilon, 'time': None, 'initial_value': None, 'status': 'ok' }
+            if nb_states > max_states:
+                result['status'] = 'skipped'
+            else:
+                try:
+                    start = time.perf_counter()
+                    result['initial_value'] = run(mdp, gamma, epsilon)
+                    result['time'] = time.perf_counter() - start
+                except Exception as e: # a failing solver must not stop the benchmark
+                    result['status'] = f'error: {type(e).__name__}: {e}'
+            results.append(result)
+    return results
+
+def print_table(results: List[Dict[str, Any]]) -> None:
+    header = f'{"model":<32} {"states":>8} {"transitions":>11} {"solver":<31} {"time (s)":>10} {"V(init)":>10}  status'
+    print(header)
+    print('-' * len(header))
+    for r in results:
+        time_str  = '' if r['time'] is None else f'{r["time"]:.4f}'
+        value_str = '' if r['initial_value'] is None else f'{r["initial_value"]:.3f}'
+        print(f'{r["model"]:<32} {r["nb_states"]:>8} {r["nb_transitions"]:>11} {r["solver"]:<31} {time_str:>10} {value_str:>10}  {r["status"]}')
+
+def main(args: List[str]) -> None:
+    parser = argparse.ArgumentParser(description='Planning benchmark')
+    parser.add_argument('--sizes',         type=int,   nargs='*', default=[10**2, 10**3, 10**4])
+    parser.add_argument('--solvers',       nargs='*',  default=list(SOLVERS), choices=list(SOLVERS))
+    parser.add_argument('--gamma',         type=float, default=.9)
+    parser.add_argument('--epsilon',       type=float, default=.01)
+    parser.add_argument('--branching',     type=int,   default=3)
+    parser.add_argument('--actions',       type=int,   default=2)
+    parser.add_argument('--cycle-density', type=float, default=.2)
+    parser.add_argument('--seed',          type=int,   default=0)
+    parser.add_argument('--json',          help='file in which the results are saved as JSON')
+    options = parser.parse_args(args)
+
+    sys.setrecursionlimit(max(sys.getrecursionlimit(), 10**5))
+    results = run_benchmark(options.sizes, options.solvers, options.gamma, options.epsilon,
+                            options.branching, options.actions, options.cycle_density, options.seed)
+    print_table(results)
+    if options.json:
+        with open(options.json, 'w') as output:
+            json.dump(results, output, indent=1)
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
+
+# eof
@@ -0,0 +1,164 @@
+'''
+  Checkpoints of the long-running solvers (value_iteration and policy_iteration in algos.py).
+
+  A checkpoint is a directory that contains:
+  values-<n>.npy: the value of each state (float64);
+  actions-<n>.npy: the index of the action selected by the policy in each state, -1 if none (int32);
+  meta.json: the solver, the iteration counter, the names of the two array files
+  and fingerprints of the states and of the actions of the MDP.
+  The .npy files can be memory-mapped (cf. Checkpoint.values_array).
+
+  The order of mdp.states() and mdp.actions() may depend on the hash seed of the process
+  (e.g., the states of DungeonMDP are collected in a set), so the arrays follow the order of the canonical keys
+  of the states and of the actions (cf. canonical_key), which do not.
+  The fingerprints of the keys are checked when the checkpoint is loaded.
+
+  Each save writes new array files (numbered n = 1, 2, ...) and then replaces meta.json,
+  which is the only file that refers to them; the files of the previous save are removed afterwards.
+  A solver that dies while saving thus leaves the previous checkpoint usable.
+'''
+
+import glob
+import hashlib
+import json
+import os
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from MDP import MDP, Policy, ExplicitPolicy
+
+def canonical_key(obj) -> str:
+    '''
+      A string that identifies obj (a state or an action) and does not depend on the hash seed of the process:
+      the elements of the sets are sorted, and the objects are represented by their class and their attributes.
+    '''
+    if isinstance(obj, (set, frozenset)):
+        return '{' + ','.join(sorted(canonical_key(elt) for elt in obj)) + '}'
+    if isinstance(obj, (tuple, list)):
+        return '(' + ','.join(canonical_key(elt) for elt in obj) + ')'
+    if isinstance(obj, dict):
+        return '{' + ','.join(sorted(canonical_key(key) + ':' + canonical_key(val) for key, val in obj.items())) + '}'
+    if hasattr(obj, '__dict__'):
+        return type(obj).__qualname__ + canonical_key(vars(obj))
+    return repr(obj)
+
+def canonical_order(objects: List) -> Tuple[List, str]:
+    '''
+      The objects sorted by canonical key, and a fingerprint of the sorted keys.
+    '''
+    keys = [ canonical_key(obj) for obj in objects ]
+    if len(set(keys)) != len(keys):
+        raise ValueError('Two states or actions have the same canonical key, they can not be checkpointed')
+    order = sorted(range(len(objects)), key=keys.__getitem__)
+    return [ objects[i] for i in order ], hashlib.sha256('\n'.join(keys[i] for i in order).encode()).hexdigest()
+
+class Checkpoint:
+    '''
+      Saves the state of a solver every `every` iterations
+      (and at most once every `period` seconds, if specified) in the specified directory.
+    '''
+    def __init__(self, path: str, every: int = 1, period: Optional[float] = None):
+        if every < 1:
+            raise ValueError(f'Invalid checkpoint frequency {every}, expected a positive number of iterations')
+        self.path_      = path
+        self.every_     = every
+        self.period_    = period
+        self.last_save_ = None
+
+    def exists(self) -> bool:
+        return os.path.exists(os.path.join(self.path_, 'meta.json'))
+
+    def due(self, iteration: int) -> bool:
+        '''
+          Indicates whether the state after the specified iteration (starting at 1) should be saved.
+        '''
+        if iteration % self.every_ != 0:
+            return False
+        return self.period_ is None or self.last_save_ is None or time.perf_counter() - self.last_save_ >= self.period_
+
+    def save(self, mdp: MDP, solver: str, iteration: int, v, pol: Optional[Policy] = None, converged: bool = False) -> None:
+        '''
+          Saves the value function v (a StateValueFunction) and the policy (if any)
+          reached by the solver after the specified number of iterations.
+        '''
+        os.makedirs(self.path_, exist_ok=True)
+        number = self.meta().get('number', 0) + 1 if self.exists() else 1
+        states, states_fingerprint = canonical_order(mdp.states())
+        meta = { 'solver': solver, 'iteration': iteration, 'nb_states': len(states), 'states_fingerprint': states_fingerprint,
+                 'number': number, 'values': f'values-{number}.npy', 'actions': None, 'converged': converged }
+        self._write_array(meta['values'], np.array([ v.value(s) for s in states ], dtype=np.float64))
+        if pol is not None:
+            actions, meta['actions_fingerprint'] = canonical_order(mdp.actions())
+            action_index    = { a : i for i, a in enumerate(actions) }
+            meta['actions'] = f'actions-{number}.npy'
+            self._write_array(meta['actions'], np.array([ action_index[pol.action(s)] if len(mdp.applicable_actions(s)) > 0 else -1 for s in states ], dtype=np.int32))
+        tmp = os.path.join(self.path_, 'meta.json.tmp')
+        with open(tmp, 'w') as output:
+            json.dump(meta, output)
+        os.replace(tmp, os.path.join(self.path_, 'meta.json'))
+        for name in glob.glob(os.path.join(self.path_, 'values-*.npy')) + glob.glob(os.path.join(self.path_, 'actions-*.npy')):
+            if not os.path.basename(name) in (meta['values'], meta['actions']):
+                os.remove(name)
+        self.last_save_ = time.perf_counter()
+
+    def _write_array(self, name: str, array: np.ndarray) -> None:
+        tmp = os.path.join(self.path_, name + '.tmp')
+        with open(tmp, 'wb') as output:
+            np.save(output, array)
+        os.replace(tmp, os.path.join(self.path_, name))
+
+    def meta(self) -> Dict[str, Any]:
+        with open(os.path.join(self.path_, 'meta.json')) as input:
+            return json.load(input)
+
+    def iteration(self) -> int:
+        return self.meta()['iteration']
+
+    def _check_model(self, mdp: MDP) -> Tuple[Dict[str, Any], List]:
+        '''
+          The metadata of the checkpoint and the states of the MDP in the order of the arrays.
+        '''
+        meta = self.meta()
+        if meta['nb_states'] != len(mdp.states()):
+            raise ValueError(f'The checkpoint {self.path_} has {meta["nb_states"]} states, the MDP has {len(mdp.states())}')
+        states, fingerprint = canonical_order(mdp.states())
+        if meta['states_fingerprint'] != fingerprint:
+            raise ValueError(f'The states of the checkpoint {self.path_} are not the states of the MDP')
+        return meta, states
+
+    def values_array(self, mmap_mode: Optional[str] = 'r') -> np.ndarray:
+        '''
+          The saved values (in the order of the canonical keys of the states), memory-mapped by default.
+        '''
+        return np.load(os.path.join(self.path_, self.meta()['values']), mmap_mode=mmap_mode)
+
+    def load_values(self, mdp: MDP):
+        '''
+          The saved value function of the specified MDP (which must be the MDP of the solver that saved the checkpoint).
+        '''
+        from algos import ExplicitStateValueFunction
+        _, states = self._check_model(mdp)
+        result = ExplicitStateValueFunction()
+        for s, val in zip(states, self.values_array()):
+            result.set_value(s, float(val))
+        return result
+
+    def load_policy(self, mdp: MDP) -> Optional[Policy]:
+        '''
+          The saved policy of the specified MDP, None if the checkpoint has no policy.
+        '''
+        meta, states = self._check_model(mdp)
+        if meta['actions'] is None:
+            return None
+        actions, fingerprint = canonical_order(mdp.actions())
+        if meta['actions_fingerprint'] != fingerprint:
+            raise ValueError(f'The actions of the checkpoint {self.path_} are not the actions of the MDP')
+        result = ExplicitPolicy(mdp)
+        for s, act in zip(states, np.load(os.path.join(self.path_, meta['actions']), mmap_mode='r')):
+            if act >= 0:
+                result.set_action(s, actions[act])
+        return result
+
+# eof
@@ -0,0 +1,64 @@
+import unittest
+
+class Test(unittest.TestCase):
+
+    def test(self):
+        from example1 import example_1
+        from compiled import CompiledMDP
+
+        mdp  = example_1()
+        cmdp = CompiledMDP(mdp)
+
+        self.assertEqual(cmdp.nb_states(), 4)
+        self.assertEqual(cmdp.nb_actions(), 2)
+        self.assertEqual(cmdp.nb_pairs(), 8)
+        self.assertEqual(cmdp.nb_outcomes(), 14)
+        self.assertEqual(cmdp.initial_state(), mdp.initial_state())
+        self.assertEqual(cmdp.state_id(mdp.initial_state()), 0)
+
+        # the compiled MDP describes the same transitions as the original MDP
+        for state in mdp.states():
+            self.assertEqual(set(cmdp.applicable_actions(state)), set(mdp.applicable_actions(state)))
+            for act in mdp.applicable_actions(state):
+                self.assertEqual(sorted(cmdp.next_states(state, act), key=str),
+                                 sorted([ (s, float(p), float(r)) for s, p, r in mdp.next_states(state, act) ], key=str))
+                reward, transitions = cmdp.reward_free_transitions(state, act)
+                self.assertAlmostEqual(reward, sum(p * r for _, p, r in mdp.next_states(state, act)))
+                self.assertEqual(sorted(transitions, key=str), sorted([ (s, float(p)) for s, p, _ in mdp.next_states(state, act) ], key=str))
+
+        # the algorithms use the expected rewards of the compiled MDP
+        from algos import value_iteration
+        from top import topological_vi
+        from nondet import NDPolicy, compute_policy_value
+        from connectedcomp import compute_connected_components
+        pol, value = value_iteration(mdp, .9, .0001)
+        cpol, cvalue = value_iteration(cmdp, .9, .0001)
+        tvalue = topological_vi(cmdp, .9, .0001, compute_connected_components(cmdp))
+        ndpol = NDPolicy()
+        for state in mdp.states():
+            ndpol.add(state, pol.action(state))
+        ndvalue = compute_policy_value(cmdp, ndpol, .9, .0001, max_iteration=1000)
+        for state in mdp.states():
+            self.assertAlmostEqual(value.value(state), cvalue.value(state))
+            self.assertAlmostEqual(value.value(state), tvalue.value(state), places=3)
+            self.assertAlmostEqual(value.value(state), ndvalue.value(state), places=3)
+
+    def test_dungeon(self):
+        from map import basic_map, DungeonMDP
+        from compiled import CompiledMDP
+
+        mdp  = DungeonMDP(basic_map())
+        cmdp = CompiledMDP(mdp)
+
+        self.assertEqual(cmdp.nb_states(), len(mdp.states()))
+        for i in range(cmdp.nb_states()):
+            self.assertEqual(cmdp.state_id(cmdp.state(i)), i)
+            self.assertAlmostEqual(sum(cmdp.probs_[o] for k in cmdp.pairs(i) for o in cmdp.outcomes(k)), len(cmdp.pairs(i)))
+
+def main():
+    unittest.main()
+
+if __name__ == "__main__":
+    main()
+
+# eof
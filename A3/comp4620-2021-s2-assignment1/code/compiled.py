@@ -0,0 +1,161 @@
+'''
+  A compiled, integer-indexed representation of an MDP.
+
+  The MDP is explored once from its initial state.
+  Each reachable state and each action gets a dense integer id,
+  and the transitions are stored as CSR (compressed sparse row) arrays:
+  the (state, action) pairs of state i are the pairs
+  state_offsets_[i] .. state_offsets_[i+1]-1,
+  and the outcomes of pair k are the outcomes
+  pair_offsets_[k] .. pair_offsets_[k+1]-1.
+  The expected immediate reward R(s,a) of each pair is precomputed (expected_rewards_), 
+  so that a backup is R + gamma P V, where P is the reward-free probability matrix 
+  given by pair_offsets_, successors_ and probs_.
+'''
+
+from collections import deque
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from MDP import Action, MDP, State
+
+class CompiledMDP(MDP):
+    def __init__(self, mdp: MDP):
+        self.mdp_         = mdp
+        self.state_list_  : List[State]       = [] # id -> State
+        self.state_ids_   : Dict[State, int]  = {} # State -> id
+        self.action_list_ : List[Action]      = [] # id -> Action
+        self.action_ids_  : Dict[Action, int] = {} # Action -> id
+
+        state_offsets = [0]
+        pair_actions  = []
+        pair_offsets  = [0]
+        successors    = []
+        probs         = []
+        rewards       = []
+
+        # breadth first exploration: the id of a state is the order in which it is discovered
+        self.get_state_id(mdp.initial_state())
+        open_ids = deque([0])
+        while open_ids:
+            state = self.state_list_[open_ids.popleft()]
+            for act in mdp.applicable_actions(state):
+                pair_actions.append(self.get_action_id(act))
+                for next_state, prob, rew in mdp.next_states(state, act):
+                    nb_known = len(self.state_list_)
+                    next_id  = self.get_state_id(next_state)
+                    if next_id == nb_known:
+                        open_ids.append(next_id)
+                    successors.append(next_id)
+                    probs.append(prob)
+                    rewards.append(rew)
+                pair_offsets.append(len(successors))
+            state_offsets.append(len(pair_actions))
+
+        self.state_offsets_ = np.array(state_offsets, dtype=np.int64)
+        self.pair_actions_  = np.array(pair_actions,  dtype=np.int64)
+        self.pair_offsets_  = np.array(pair_offsets,  dtype=np.int64)
+        self.successors_    = np.array(successors,    dtype=np.int64)
+        self.probs_         = np.array(probs,         dtype=np.float64)
+        self.rewards_       = np.array(rewards,       dtype=np.float64)
+        # the state of each pair, and the pair of each outcome (useful for segmented operations)
+        self.pair_states_      = np.repeat(np.arange(self.nb_states()), np.diff(self.state_offsets_))
+        self.outcome_pairs_    = np.repeat(np.arange(self.nb_pairs()),  np.diff(self.pair_offsets_))
+        self.expected_rewards_ = np.bincount(self.outcome_pairs_, weights=self.probs_ * self.rewards_, minlength=self.nb_pairs())
+        self.transitions_      : Dict[Tuple[State, Action], Tuple[float, List[Tuple[State, float]]]] = {} # cf. reward_free_transitions
+
+    def get_state_id(self, s: State) -> int:
+        '''
+        Makes sure that the compiled MDP knows about this state
+        '''
+        if not s in self.state_ids_:
+            self.state_ids_[s] = len(self.state_list_)
+            self.state_list_.append(s)
+        return self.state_ids_[s]
+
+    def get_action_id(self, a: Action) -> int:
+        '''
+        Makes sure that the compiled MDP knows about this action
+        '''
+        if not a in self.action_ids_:
+            self.action_ids_[a] = len(self.action_list_)
+            self.action_list_.append(a)
+        return self.action_ids_[a]
+
+    def nb_states(self) -> int:
+        return len(self.state_list_)
+
+    def nb_actions(self) -> int:
+        return len(self.action_list_)
+
+    def nb_pairs(self) -> int:
+        return len(self.pair_actions_)
+
+    def nb_outcomes(self) -> int:
+        return len(self.successors_)
+
+    def state_id(self, s: State) -> int:
+        return self.state_ids_[s]
+
+    def state(self, i: int) -> State:
+        return self.state_list_[i]
+
+    def action_id(self, a: Action) -> int:
+        return self.action_ids_[a]
+
+    def action(self, i: int) -> Action:
+        return self.action_list_[i]
+
+    def pairs(self, i: int) -> range:
+        '''
+          The indices of the (state, action) pairs of the state with id i.
+        '''
+        return range(self.state_offsets_[i], self.state_offsets_[i+1])
+
+    def outcomes(self, k: int) -> range:
+        '''
+          The indices of the outcomes of the pair k.
+        '''
+        return range(self.pair_offsets_[k], self.pair_offsets_[k+1])
+
+    # The MDP interface, expressed in terms of the original states and actions.
+    # The original MDP is not queried anymore.
+
+    def states(self) -> List[State]:
+        return self.state_list_
+
+    def actions(self) -> List[Action]:
+        return self.action_list_
+
+    def applicable_actions(self, s: State) -> List[Action]:
+        return [ self.action_list_[self.pair_actions_[k]] for k in self.pairs(self.state_ids_[s]) ]
+
+    def next_states(self, s: State, a: Action) -> List[Tuple[State,float,float]]:
+        act_id = self.action_ids_[a]
+        for k in self.pairs(self.state_ids_[s]):
+            if self.pair_actions_[k] == act_id:
+                return [ (self.state_list_[self.successors_[o]], float(self.probs_[o]), float(self.rewards_[o])) for o in self.outcomes(k) ]
+        return []
+
+    def initial_state(self) -> State:
+        return self.state_list_[0]
+
+    def reward_free_transitions(self, s: State, a: Action) -> Tuple[float, List[Tuple[State, float]]]:
+        '''
+          The expected immediate reward of performing action a in state s, 
+          and the outcomes of this action as a list of elements [s',prob].
+          The result is cached, so that the algorithms of algos.py do not rebuild the outcomes at each backup.
+        '''
+        key = (s, a)
+        if not key in self.transitions_:
+            act_id = self.action_ids_[a]
+            result = (0., [])
+            for k in self.pairs(self.state_ids_[s]):
+                if self.pair_actions_[k] == act_id:
+                    result = (float(self.expected_rewards_[k]), [ (self.state_list_[self.successors_[o]], float(self.probs_[o])) for o in self.outcomes(k) ])
+                    break
+            self.transitions_[key] = result
+        return self.transitions_[key]
+
+# eof
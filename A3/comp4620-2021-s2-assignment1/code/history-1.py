@@ -0,0 +1,55 @@
+import unittest
+
+class Test(unittest.TestCase):
+
+    def test(self):
+        import os
+        import tempfile
+        import numpy as np
+        from example1 import example_1
+        from compiled import CompiledMDP
+        from algos import value_iteration, simulate
+        from history import ArrayHistory
+
+        mdp  = example_1()
+        cmdp = CompiledMDP(mdp)
+        pol, _ = value_iteration(mdp=mdp, gamma=.9, epsilon=.0001)
+
+        h = simulate(mdp, pol, 100, h=ArrayHistory(cmdp, capacity=1))
+        self.assertEqual(h.length(), 100)
+        self.assertEqual(h.state(0), mdp.initial_state())
+        for i in range(h.length()):
+            self.assertEqual(h.action(i), pol.action(h.state(i)))
+            self.assertIn((h.state(i+1), h.reward(i)), [ (s, r) for s, p, r in mdp.next_states(h.state(i), h.action(i)) if p > 0 ])
+        self.assertAlmostEqual(h.discounted_return(.9), sum(h.reward(i) * .9 ** i for i in range(h.length())))
+        self.assertEqual(len(h.pretty_repr()), 101)
+
+        # the prefix shares the arrays until it is extended
+        prefix = h.prefix(10)
+        self.assertEqual(prefix.length(), 10)
+        self.assertEqual(prefix.last_state(), h.state(10))
+        self.assertTrue(np.shares_memory(prefix.rewards(), h.rewards()))
+        prefix.add(None, h.state(0), 1000.)
+        self.assertEqual(prefix.length(), 11)
+        self.assertFalse(np.shares_memory(prefix.rewards(), h.rewards()))
+        self.assertNotEqual(h.reward(10), 1000.)
+        middle = h.slice(20, 30)
+        self.assertEqual((middle.state(0), middle.reward(9)), (h.state(20), h.reward(29)))
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'h.npz')
+            h.save(path)
+            loaded = ArrayHistory.load(cmdp, path)
+            self.assertEqual(repr(loaded), repr(h))
+            self.assertEqual(repr(ArrayHistory.from_history(cmdp, simulate(mdp, pol, 0))), str(mdp.initial_state()))
+
+        with self.assertRaises(ValueError):
+            ArrayHistory.from_arrays(cmdp, np.zeros(3, dtype=np.int32), np.zeros(3, dtype=np.int32), np.zeros(3))
+
+def main():
+    unittest.main()
+
+if __name__ == "__main__":
+    main()
+
+# eof
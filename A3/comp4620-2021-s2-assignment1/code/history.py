@@ -0,0 +1,156 @@
+'''
+  A columnar History of a compiled MDP (cf. compiled.py).
+
+  Instead of one list that interleaves the states, the actions and the rewards (cf. MDP.History),
+  the trajectory is stored in three NumPy arrays: the state ids, the action ids (-1 for None) and the rewards.
+  The arrays grow geometrically, so that add is amortised O(1).
+'''
+
+from typing import Optional
+
+import numpy as np
+
+from MDP import Action, State, History
+from compiled import CompiledMDP
+
+class ArrayHistory(History):
+    def __init__(self, cmdp: CompiledMDP, init_state: Optional[State] = None, capacity: int = 16):
+        self.mdp_     = cmdp
+        self.states_  = np.zeros(capacity + 1, dtype=np.int32)
+        self.actions_ = np.zeros(capacity,     dtype=np.int32)
+        self.rewards_ = np.zeros(capacity)
+        self.length_  = 0
+        self.shared_  = False # whether the arrays are shared with another history (cf. prefix)
+        self.states_[0] = cmdp.state_id(cmdp.initial_state() if init_state is None else init_state)
+
+    @classmethod
+    def from_arrays(cls, cmdp: CompiledMDP, states: np.ndarray, actions: np.ndarray, rewards: np.ndarray) -> 'ArrayHistory':
+        '''
+          A history that uses the specified arrays (states has one more element than actions and rewards) without copying them.
+        '''
+        if len(states) != len(actions) + 1 or len(actions) != len(rewards):
+            raise ValueError(f'Inconsistent history arrays: {len(states)} states, {len(actions)} actions, {len(rewards)} rewards')
+        result = cls.__new__(cls)
+        result.mdp_     = cmdp
+        result.states_  = states
+        result.actions_ = actions
+        result.rewards_ = rewards
+        result.length_  = len(actions)
+        result.shared_  = True
+        return result
+
+    @classmethod
+    def from_history(cls, cmdp: CompiledMDP, h: History) -> 'ArrayHistory':
+        result = cls(cmdp, h.state(0), capacity=max(1, h.length()))
+        for i in range(h.length()):
+            result.add(h.action(i), h.state(i+1), h.reward(i))
+        return result
+
+    def __repr__(self):
+        strings = [ str(self.state(0)) ]
+        for i in range(self.length()):
+            strings.extend([ str(self.action(i)), str(self.reward(i)), str(self.state(i+1)) ])
+        return ' '.join(strings)
+
+    def _reserve(self, length: int) -> None:
+        '''
+          Makes sure that the arrays can hold length steps and are not shared (copy on write).
+        '''
+        if length <= len(self.actions_) and not self.shared_:
+            return
+        capacity = max(length, 2 * len(self.actions_), 16)
+        for name in ('states_', 'actions_', 'rewards_'):
+            old = getattr(self, name)
+            new = np.zeros(capacity + (1 if name == 'states_' else 0), dtype=old.dtype)
+            size = self.length_ + (1 if name == 'states_' else 0)
+            new[:size] = old[:size]
+            setattr(self, name, new)
+        self.shared_ = False
+
+    def add(self, act: Action, state: State, rew: float) -> None:
+        self.add_ids(-1 if act is None else self.mdp_.action_id(act), self.mdp_.state_id(state), rew)
+
+    def add_ids(self, action_id: int, state_id: int, rew: float) -> None:
+        '''
+          Same as add, with the ids of the action and of the state.
+        '''
+        self._reserve(self.length_ + 1)
+        self.actions_[self.length_]    = action_id
+        self.rewards_[self.length_]    = rew
+        self.states_[self.length_ + 1] = state_id
+        self.length_ += 1
+
+    def state(self, i) -> State:
+        '''
+          From 0 to length() inclusive
+        '''
+        return self.mdp_.state(self.state_ids()[i])
+
+    def action(self, i) -> Action:
+        '''
+          From 0 to length()-1 inclusive
+        '''
+        act = self.action_ids()[i]
+        return None if act < 0 else self.mdp_.action(act)
+
+    def reward(self, i) -> float:
+        '''
+          From 0 to length()-1 inclusive
+        '''
+        return float(self.rewards()[i])
+
+    def length(self) -> int:
+        return self.length_
+
+    # Views of the columns (no copy).
+
+    def state_ids(self) -> np.ndarray:
+        return self.states_[:self.length_ + 1]
+
+    def action_ids(self) -> np.ndarray:
+        return self.actions_[:self.length_]
+
+    def rewards(self) -> np.ndarray:
+        return self.rewards_[:self.length_]
+
+    def slice(self, start: int, stop: int) -> 'ArrayHistory':
+        '''
+          The steps start .. stop-1, as a history from state(start) to state(stop) that shares the arrays of this history.
+          Adding steps to the result copies its arrays first.
+        '''
+        return ArrayHistory.from_arrays(self.mdp_, self.states_[start:stop+1], self.actions_[start:stop], self.rewards_[start:stop])
+
+    def prefix(self, length: int) -> 'ArrayHistory':
+        '''
+          The first length steps, without copy (cf. slice).
+        '''
+        return self.slice(0, length)
+
+    def copy(self) -> 'ArrayHistory':
+        result = ArrayHistory.from_arrays(self.mdp_, self.state_ids().copy(), self.action_ids().copy(), self.rewards().copy())
+        result.shared_ = False
+        return result
+
+    def discounted_return(self, gamma: float) -> float:
+        '''
+          The sum of the rewards discounted by gamma^t.
+        '''
+        return float(np.dot(self.rewards(), np.power(gamma, np.arange(self.length_, dtype=np.float64))))
+
+    def save(self, path: str) -> None:
+        '''
+          Saves the columns in a .npz file (cf. load).
+        '''
+        np.savez(path, states=self.state_ids(), actions=self.action_ids(), rewards=self.rewards())
+
+    @classmethod
+    def load(cls, cmdp: CompiledMDP, path: str) -> 'ArrayHistory':
+        '''
+          Loads a history saved by save; cmdp must be the compiled MDP of the saved history.
+        '''
+        with np.load(path) as data:
+            result = cls.from_arrays(cmdp, data['states'], data['actions'], data['rewards'])
+        result.shared_ = False
+        return result
+
+# eof
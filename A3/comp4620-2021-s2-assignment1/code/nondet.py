@@ -1,7 +1,8 @@
 from typing import Dict, Tuple, Optional
 
 from MDP import Action, State, MDP, Policy
-from algos import ExplicitStateValueFunction, StateValueFunction, value_iteration
+from algos import ExplicitStateValueFunction, StateValueFunction, value_iteration, one_step_lookahead
+from telemetry import Telemetry, SolverMonitor
 
 class NDPolicy:
     def __init__(self, copy: Optional = None): 
@@ -34,7 +35,13 @@ class NDPolicy:
     def actions(self, s):
         return self._actions[s]
 
-def compute_policy_value(mdp: MDP, ndpol: NDPolicy, gamma: float, epsilon: float, max_iteration: int) -> StateValueFunction:
+def compute_policy_value(mdp: MDP, ndpol: NDPolicy, gamma: float, epsilon: float, max_iteration: int, telemetry: Optional[Telemetry] = None) -> StateValueFunction:
+    '''
+      Computes the value of the non-deterministic policy, i.e., the value of its worst deterministic policy.
+      Each iteration is reported to the telemetry sink, if any.
+    '''
+    monitor        = SolverMonitor('compute_policy_value', mdp, telemetry)
+    mdp            = monitor.mdp()
     current_svalue = ExplicitStateValueFunction()
     #! compute_v_of_policy
     while max_iteration > 0: 
@@ -42,10 +49,7 @@ def compute_policy_value(mdp: MDP, ndpol: NDPolicy, gamma: float, epsilon: float
         Q_s_a = {}
         for s in mdp.states():
             for a in mdp.applicable_actions(s):
-                value = 0
-                for next_s, prob, rew in mdp.next_states(s,a):
-                    value += prob * (rew + (gamma * current_svalue.value(next_s)))
-                Q_s_a[(s, a)] = value
+                Q_s_a[(s, a)] = one_step_lookahead(mdp, current_svalue, gamma, s, a)
         #! compute_v_from_q_and_policy
         new_svalue = ExplicitStateValueFunction()
         for s in mdp.states():
@@ -53,6 +57,7 @@ def compute_policy_value(mdp: MDP, ndpol: NDPolicy, gamma: float, epsilon: float
             new_svalue.set_value(s, Q_s_a[(s, Min_act)])
         #! state_value_difference
         diff = max([abs(current_svalue.value(s) - new_svalue.value(s)) for s in mdp.states()])
+        monitor.iteration(diff, len(mdp.states()))
         if diff < epsilon:
             current_svalue = new_svalue
             break
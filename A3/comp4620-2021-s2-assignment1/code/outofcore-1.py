@@ -0,0 +1,63 @@
+import unittest
+
+class Test(unittest.TestCase):
+
+    def test(self):
+        import os
+        import tempfile
+        from map import basic_map, DungeonMDP
+        from example1 import example_1
+        from compiled import CompiledMDP
+        from vectorized import vectorized_value_iteration
+        from outofcore import TransitionStore, TransitionStoreWriter, write_transition_store, out_of_core_value_iteration
+
+        with tempfile.TemporaryDirectory() as tmp:
+            for index, mdp in enumerate([ example_1(), DungeonMDP(basic_map()) ]):
+                path = os.path.join(tmp, str(index))
+                states, actions = write_transition_store(mdp, path)
+                store = TransitionStore(path)
+                cmdp  = CompiledMDP(mdp)
+                # same ids and layout as the compiled MDP
+                self.assertEqual(states, cmdp.state_list_)
+                self.assertEqual(actions, cmdp.action_list_)
+                self.assertEqual(store.nb_outcomes(), cmdp.nb_outcomes())
+                self.assertEqual(list(store.successors_), list(cmdp.successors_))
+                self.assertEqual(list(store.pair_offsets_), list(cmdp.pair_offsets_))
+
+                vpol, vvalue = vectorized_value_iteration(mdp=cmdp, gamma=.9, epsilon=.0001)
+                for chunk_size in [ 1 + 30 * index, 7, 1 << 16 ]:
+                    action_ids, values = out_of_core_value_iteration(store, gamma=.9, epsilon=.0001, chunk_size=chunk_size)
+                    for i, state in enumerate(states):
+                        self.assertAlmostEqual(vvalue.value(state), values[i])
+                        if action_ids[i] >= 0:
+                            self.assertEqual(vpol.action(state), actions[action_ids[i]])
+
+            # a store written directly from integer ids, flushed in several blocks
+            path = os.path.join(tmp, 'loop')
+            with TransitionStoreWriter(path, buffer_size=2) as writer:
+                writer.add_pair(0, [ 1 ], [ 1. ], [ 1. ])
+                writer.end_state()
+                writer.add_pair(0, [ 0 ], [ 1. ], [ 0. ])
+                writer.add_pair(1, [ 0, 1 ], [ .5, .5 ], [ 2., 2. ])
+                writer.end_state()
+            store = TransitionStore(path)
+            self.assertEqual((store.nb_states(), store.nb_actions(), store.nb_pairs(), store.nb_outcomes()), (2, 2, 3, 4))
+            action_ids, values = out_of_core_value_iteration(store, gamma=.5, epsilon=.00001, chunk_size=1)
+            self.assertEqual(list(action_ids), [ 0, 1 ])
+            self.assertAlmostEqual(values[1], 3.6, places=3) # V(1) = 2 + .25 V(0) + .25 V(1), V(0) = 1 + .5 V(1)
+
+            # an aborted exploration does not leave a store that can be opened, even over a complete store
+            with self.assertRaises(RuntimeError):
+                with TransitionStoreWriter(path) as writer:
+                    writer.add_pair(0, [ 5 ], [ 1. ], [ 1. ])
+                    raise RuntimeError('exploration failed')
+            with self.assertRaises(FileNotFoundError):
+                TransitionStore(path)
+
+def main():
+    unittest.main()
+
+if __name__ == "__main__":
+    main()
+
+# eof
@@ -0,0 +1,221 @@
+'''
+  Out-of-core value iteration, for models whose transitions do not fit in memory.
+
+  The transitions are stored on disk in the CSR layout of compiled.py
+  (state_offsets, pair_actions, pair_offsets, successors, probs, rewards, expected_rewards),
+  one raw binary file per array, plus a meta.json file with the sizes.
+  The files are memory-mapped, and a Bellman sweep streams through them in chunks of consecutive states,
+  so that the arrays of a chunk are read sequentially; only the value vectors stay resident.
+  The successors and the actions are stored as int32 (a store has less than 2^31 states and actions).
+'''
+
+import json
+import os
+from collections import deque
+from typing import Dict, Iterator, List, Tuple
+
+import numpy as np
+
+from MDP import Action, MDP, State
+from vectorized import segmented_argmax
+
+STORE_ARRAYS = {
+    'state_offsets'    : np.int64,
+    'pair_actions'     : np.int32,
+    'pair_offsets'     : np.int64,
+    'successors'       : np.int32,
+    'probs'            : np.float64,
+    'rewards'          : np.float64,
+    'expected_rewards' : np.float64, # per pair
+}
+
+class TransitionStoreWriter:
+    '''
+      Writes a transition store incrementally: the states must be added in the order of their ids,
+      each of them with all its pairs (add_pair) followed by end_state.
+      The arrays are buffered and appended to their files every buffer_size elements.
+      meta.json is only written by close, so that an incomplete store can not be opened (cf. abort).
+    '''
+    def __init__(self, path: str, buffer_size: int = 1 << 20):
+        os.makedirs(path, exist_ok=True)
+        if os.path.exists(os.path.join(path, 'meta.json')):
+            # the store is overwritten: it is invalid until close
+            os.remove(os.path.join(path, 'meta.json'))
+        self.path_        = path
+        self.buffer_size_ = buffer_size
+        self.files_       = { name : open(os.path.join(path, name + '.bin'), 'wb') for name in STORE_ARRAYS }
+        self.buffers_     = { name : [] for name in STORE_ARRAYS }
+        self.sizes_       = { name : 0 for name in STORE_ARRAYS }
+        self.nb_pairs_    = 0
+        self.nb_outcomes_ = 0
+        self.nb_actions_  = 0
+        self._append('state_offsets', [0])
+        self._append('pair_offsets', [0])
+
+    def _append(self, name: str, values) -> None:
+        buffer = self.buffers_[name]
+        buffer.extend(values)
+        if len(buffer) >= self.buffer_size_:
+            self._flush(name)
+
+    def _flush(self, name: str) -> None:
+        buffer = self.buffers_[name]
+        np.array(buffer, dtype=STORE_ARRAYS[name]).tofile(self.files_[name])
+        self.sizes_[name] += len(buffer)
+        buffer.clear()
+
+    def add_pair(self, action_id: int, successors: List[int], probs: List[float], rewards: List[float]) -> None:
+        if action_id >= 2**31 or any(succ >= 2**31 for succ in successors):
+            raise ValueError('A transition store is limited to 2^31 states and actions')
+        self.nb_actions_   = max(self.nb_actions_, action_id + 1)
+        self.nb_pairs_    += 1
+        self.nb_outcomes_ += len(successors)
+        self._append('pair_actions', [action_id])
+        self._append('successors', successors)
+        self._append('probs', probs)
+        self._append('rewards', rewards)
+        expected_reward = 0.
+        for prob, rew in zip(probs, rewards):
+            expected_reward += prob * rew
+        self._append('expected_rewards', [expected_reward])
+        self._append('pair_offsets', [self.nb_outcomes_])
+
+    def end_state(self) -> None:
+        self._append('state_offsets', [self.nb_pairs_])
+
+    def close(self) -> None:
+        for name in STORE_ARRAYS:
+            self._flush(name)
+            self.files_[name].close()
+        meta = { 'sizes': self.sizes_, 'nb_actions': self.nb_actions_ }
+        with open(os.path.join(self.path_, 'meta.json'), 'w') as output:
+            json.dump(meta, output)
+
+    def abort(self) -> None:
+        '''
+          Closes the files without writing meta.json: the incomplete store can not be opened.
+        '''
+        for name in STORE_ARRAYS:
+            self.files_[name].close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *args):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+def write_transition_store(mdp: MDP, path: str) -> Tuple[List[State], List[Action]]:
+    '''
+      Explores the MDP from its initial state (as CompiledMDP does) and writes its transitions in a store.
+      The transitions are not kept in memory, but the states and the actions are:
+      returns the state of each state id and the action of each action id.
+    '''
+    state_list  : List[State]       = []
+    state_ids   : Dict[State, int]  = {}
+    action_list : List[Action]      = []
+    action_ids  : Dict[Action, int] = {}
+
+    def get_id(obj, ids, objects) -> int:
+        if not obj in ids:
+            ids[obj] = len(objects)
+            objects.append(obj)
+        return ids[obj]
+
+    with TransitionStoreWriter(path) as writer:
+        get_id(mdp.initial_state(), state_ids, state_list)
+        open_ids = deque([0])
+        while open_ids:
+            state = state_list[open_ids.popleft()]
+            for act in mdp.applicable_actions(state):
+                successors, probs, rewards = [], [], []
+                for next_state, prob, rew in mdp.next_states(state, act):
+                    nb_known = len(state_list)
+                    next_id  = get_id(next_state, state_ids, state_list)
+                    if next_id == nb_known:
+                        open_ids.append(next_id)
+                    successors.append(next_id)
+                    probs.append(prob)
+                    rewards.append(rew)
+                writer.add_pair(get_id(act, action_ids, action_list), successors, probs, rewards)
+            writer.end_state()
+    return state_list, action_list
+
+class TransitionStore:
+    '''
+      A transition store opened read-only, with memory-mapped arrays (same names as in CompiledMDP).
+    '''
+    def __init__(self, path: str):
+        with open(os.path.join(path, 'meta.json')) as input:
+            meta = json.load(input)
+        self.nb_actions_ = meta['nb_actions']
+        arrays = {}
+        for name, dtype in STORE_ARRAYS.items():
+            size = meta['sizes'][name]
+            # numpy can not map an empty file
+            arrays[name] = np.zeros(0, dtype=dtype) if size == 0 else np.memmap(os.path.join(path, name + '.bin'), dtype=dtype, mode='r', shape=(size,))
+        self.state_offsets_    = arrays['state_offsets']
+        self.pair_actions_     = arrays['pair_actions']
+        self.pair_offsets_     = arrays['pair_offsets']
+        self.successors_       = arrays['successors']
+        self.probs_            = arrays['probs']
+        self.rewards_          = arrays['rewards']
+        self.expected_rewards_ = arrays['expected_rewards']
+
+    def nb_states(self) -> int:
+        return len(self.state_offsets_) - 1
+
+    def nb_actions(self) -> int:
+        return self.nb_actions_
+
+    def nb_pairs(self) -> int:
+        return len(self.pair_actions_)
+
+    def nb_outcomes(self) -> int:
+        return len(self.successors_)
+
+    def chunks(self, chunk_size: int) -> Iterator[Tuple[int, int]]:
+        '''
+          The chunks [lo, hi) of at most chunk_size consecutive states.
+        '''
+        for lo in range(0, self.nb_states(), chunk_size):
+            yield lo, min(lo + chunk_size, self.nb_states())
+
+def streaming_bellman_backup(store: TransitionStore, v: np.ndarray, gamma: float, new_v: np.ndarray, best_pairs: np.ndarray, chunk_size: int) -> float:
+    '''
+      Performs the Bellman backup of the value vector v chunk by chunk:
+      the new values and the greedy pairs are written in new_v and best_pairs.
+      Returns the max absolute difference between v and new_v.
+    '''
+    residual = 0.
+    for lo, hi in store.chunks(chunk_size):
+        state_offsets = np.asarray(store.state_offsets_[lo:hi+1])
+        p_lo, p_hi    = state_offsets[0], state_offsets[-1]
+        pair_offsets  = np.asarray(store.pair_offsets_[p_lo:p_hi+1])
+        o_lo, o_hi    = pair_offsets[0], pair_offsets[-1]
+        successors    = store.successors_[o_lo:o_hi]
+        outcome_pairs = np.repeat(np.arange(p_hi - p_lo), np.diff(pair_offsets))
+        pair_states   = np.repeat(np.arange(hi - lo), np.diff(state_offsets))
+        q = store.expected_rewards_[p_lo:p_hi] + gamma * np.bincount(outcome_pairs, weights=store.probs_[o_lo:o_hi] * v[successors], minlength=p_hi - p_lo)
+        best_pairs[lo:hi], new_v[lo:hi] = segmented_argmax(q, state_offsets, pair_states)
+        residual = max(residual, np.abs(new_v[lo:hi] - v[lo:hi]).max(initial=0))
+    return residual
+
+def out_of_core_value_iteration(store: TransitionStore, gamma: float, epsilon: float, chunk_size: int = 1 << 16) -> Tuple[np.ndarray, np.ndarray]:
+    '''
+      Performs the value iteration algorithm on a transition store, with streaming backups (cf. streaming_bellman_backup).
+      Returns the id of the action selected in each state (-1 if none) and the value of each state.
+      Only two value vectors and the greedy pairs are kept in memory.
+    '''
+    vs         = np.zeros(store.nb_states())
+    newvs      = np.zeros(store.nb_states())
+    best_pairs = np.full(store.nb_states(), -1, dtype=np.int64)
+    while True:
+        diff = streaming_bellman_backup(store, vs, gamma, newvs, best_pairs, chunk_size)
+        if diff < epsilon:
+            return np.where(best_pairs >= 0, store.pair_actions_[np.maximum(best_pairs, 0)], -1), newvs
+        vs, newvs = newvs, vs
+
+# eof
@@ -0,0 +1,25 @@
+import unittest
+
+class Test(unittest.TestCase):
+
+    def test(self):
+        from map import basic_map, DungeonMDP
+        from example1 import example_1
+        from vectorized import vectorized_value_iteration
+        from parallel import parallel_value_iteration
+
+        for mdp in [ example_1(), DungeonMDP(basic_map()) ]:
+            vpol, vvalue = vectorized_value_iteration(mdp=mdp, gamma=.9, epsilon=.0001)
+            for nbprocesses in [ 1, 3 ]:
+                ppol, pvalue = parallel_value_iteration(mdp=mdp, gamma=.9, epsilon=.0001, nbprocesses=nbprocesses)
+                for state in mdp.states():
+                    self.assertAlmostEqual(vvalue.value(state), pvalue.value(state))
+                    self.assertEqual(vpol.action(state), ppol.action(state))
+
+def main():
+    unittest.main()
+
+if __name__ == "__main__":
+    main()
+
+# eof
@@ -0,0 +1,126 @@
+'''
+  Multi-process value iteration on a compiled MDP (cf. compiled.py).
+
+  The states are split in contiguous shards, one per worker process.
+  The transition arrays and two value vectors live in shared memory:
+  at iteration i, every worker reads the vector i%2 and writes its shard of the vector (i+1)%2.
+  The workers then meet at a barrier, and each of them reduces the residuals of all the shards
+  to decide whether to stop.
+'''
+
+from multiprocessing import Barrier, Process
+from multiprocessing.shared_memory import SharedMemory
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from MDP import MDP, Policy
+from algos import StateValueFunction
+from vectorized import ArrayPolicy, ArrayStateValueFunction, to_compiled, segmented_argmax, pair_actions
+
+def share_array(array: np.ndarray, blocks: List[SharedMemory]) -> Tuple[Tuple[str, Tuple[int, ...], str], np.ndarray]:
+    '''
+      Copies the array in a new shared memory block (added to blocks).
+      Returns the description needed to attach to the block (cf. attach_array) and the shared copy.
+    '''
+    block = SharedMemory(create=True, size=max(1, array.nbytes))
+    blocks.append(block)
+    shared = np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)
+    shared[...] = array
+    return (block.name, array.shape, array.dtype.str), shared
+
+def attach_array(description: Tuple[str, Tuple[int, ...], str], blocks: List[SharedMemory]) -> np.ndarray:
+    name, shape, dtype = description
+    block = SharedMemory(name=name)
+    blocks.append(block)
+    return np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf)
+
+def compute_shards(state_offsets: np.ndarray, pair_offsets: np.ndarray, nb_shards: int) -> List[Tuple[int, int]]:
+    '''
+      Splits the states in contiguous shards [lo, hi) with about the same number of outcomes.
+    '''
+    outcome_ends = pair_offsets[state_offsets[1:]]
+    bounds = [0] + [ int(np.searchsorted(outcome_ends, outcome_ends[-1] * i / nb_shards)) for i in range(1, nb_shards) ] + [ len(outcome_ends) ]
+    return [ (bounds[i], max(bounds[i], bounds[i+1])) for i in range(nb_shards) ]
+
+def value_iteration_worker(arrays: Dict[str, Tuple], lo: int, hi: int, index: int, gamma: float, epsilon: float, barrier) -> None:
+    '''
+      Performs the Jacobi sweeps of the states lo .. hi-1 until all the shards have converged.
+    '''
+    blocks = []
+    try:
+        shared = { name : attach_array(description, blocks) for name, description in arrays.items() }
+        values, residuals, best, iterations = shared['values'], shared['residuals'], shared['best'], shared['iterations']
+
+        # the pairs and the outcomes of a shard are contiguous
+        state_offsets = shared['state_offsets'][lo:hi+1]
+        p_lo, p_hi    = state_offsets[0], state_offsets[-1]
+        o_lo, o_hi    = shared['pair_offsets'][p_lo], shared['pair_offsets'][p_hi]
+        successors    = shared['successors'][o_lo:o_hi]
+        probs         = shared['probs'][o_lo:o_hi]
+        rewards       = shared['expected_rewards'][p_lo:p_hi]
+        outcome_pairs = np.repeat(np.arange(p_hi - p_lo), np.diff(shared['pair_offsets'][p_lo:p_hi+1]))
+        pair_states   = np.repeat(np.arange(hi - lo), np.diff(state_offsets))
+
+        it = 0
+        while True:
+            old, new = values[it % 2], values[(it + 1) % 2]
+            q = rewards + gamma * np.bincount(outcome_pairs, weights=probs * old[successors], minlength=p_hi - p_lo)
+            best[lo:hi], new[lo:hi] = segmented_argmax(q, state_offsets, pair_states)
+            residuals[it % 2, index] = np.abs(new[lo:hi] - old[lo:hi]).max(initial=0)
+            barrier.wait()
+            if residuals[it % 2].max() < epsilon:
+                if index == 0:
+                    iterations[0] = it + 1
+                return
+            it += 1
+    except Exception:
+        barrier.abort() # the other workers must not wait for this one
+        raise
+    finally:
+        for block in blocks:
+            block.close()
+
+def parallel_value_iteration(mdp: MDP, gamma: float, epsilon: float, nbprocesses: int) -> Tuple[Policy, StateValueFunction]:
+    '''
+      Performs the value iteration algorithm on the compiled version of the specified MDP,
+      with the states sharded across nbprocesses worker processes.
+      Same contract as algos.value_iteration.
+    '''
+    cmdp   = to_compiled(mdp)
+    shards = compute_shards(cmdp.state_offsets_, cmdp.pair_offsets_, nbprocesses)
+    blocks = []
+    try:
+        arrays = {}
+        shared = {}
+        for name, array in [
+            ('state_offsets',    cmdp.state_offsets_),
+            ('pair_offsets',     cmdp.pair_offsets_),
+            ('successors',       cmdp.successors_),
+            ('probs',            cmdp.probs_),
+            ('expected_rewards', cmdp.expected_rewards_),
+            ('values',           np.zeros((2, cmdp.nb_states()))),
+            ('residuals',        np.zeros((2, nbprocesses))),
+            ('best',             np.full(cmdp.nb_states(), -1, dtype=np.int64)),
+            ('iterations',       np.zeros(1, dtype=np.int64)),
+        ]:
+            arrays[name], shared[name] = share_array(array, blocks)
+        barrier = Barrier(nbprocesses)
+        workers = [ Process(target=value_iteration_worker, args=(arrays, lo, hi, i, gamma, epsilon, barrier)) for i, (lo, hi) in enumerate(shards) ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        if any(worker.exitcode != 0 for worker in workers):
+            raise RuntimeError('A value iteration worker failed')
+
+        result_values = shared['values'][shared['iterations'][0] % 2].copy()
+        result_pairs  = shared['best'].copy()
+        del shared # the views must not be used once the blocks are closed
+    finally:
+        for block in blocks:
+            block.close()
+            block.unlink()
+    return ArrayPolicy(cmdp, pair_actions(cmdp, result_pairs)), ArrayStateValueFunction(cmdp, result_values)
+
+# eof
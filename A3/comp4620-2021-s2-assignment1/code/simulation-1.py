@@ -0,0 +1,37 @@
+import unittest
+
+class Test(unittest.TestCase):
+
+    def test(self):
+        from example1 import example_1
+        from algos import value_iteration
+        from simulation import batch_simulate
+
+        mdp = example_1()
+        pol, vivalue = value_iteration(mdp=mdp, gamma=.9, epsilon=.0001)
+
+        # the average discounted return estimates the value of the initial state
+        traj = batch_simulate(mdp, pol, nbsteps=100, nbtrajectories=20000, gamma=.9, seed=0)
+        self.assertAlmostEqual(traj.returns.mean(), vivalue.value(mdp.initial_state()), delta=.5)
+        self.assertEqual(traj.states.shape, (20000, 101))
+        h = traj.history(0)
+        self.assertEqual(h.length(), 100)
+        self.assertEqual(h.state(0), mdp.initial_state())
+        for i in range(h.length()):
+            self.assertEqual(h.action(i), pol.action(h.state(i)))
+            self.assertIn(h.state(i+1), [ s for s, p, r in mdp.next_states(h.state(i), h.action(i)) if p > 0 ])
+
+        # the same seed gives the same trajectories, also with several processes
+        traj1 = batch_simulate(mdp, pol, nbsteps=100, nbtrajectories=1000, gamma=.9, seed=1, record=False, nbprocesses=2)
+        traj2 = batch_simulate(mdp, pol, nbsteps=100, nbtrajectories=1000, gamma=.9, seed=1, record=False, nbprocesses=2)
+        self.assertEqual(traj1.nb_trajectories(), 1000)
+        self.assertTrue((traj1.returns == traj2.returns).all())
+        self.assertIsNone(traj1.states)
+
+def main():
+    unittest.main()
+
+if __name__ == "__main__":
+    main()
+
+# eof
@@ -0,0 +1,50 @@
+import unittest
+
+class Test(unittest.TestCase):
+
+    def test(self):
+        import os
+        import tempfile
+        import numpy as np
+        from example1 import example_1
+        from compiled import CompiledMDP
+        from algos import value_iteration
+        from simulation import RunningStats, stream_simulate, simulate_to_file, load_trace
+
+        mdp  = example_1()
+        cmdp = CompiledMDP(mdp)
+        pol, vivalue = value_iteration(mdp=mdp, gamma=.9, epsilon=.0001)
+
+        stats  = RunningStats(np.zeros(cmdp.nb_states(), dtype=np.int64))
+        chunks = list(stream_simulate(cmdp, pol, 1000, chunk_size=300, gamma=.9, seed=0, stats=stats))
+        self.assertEqual([ c.length() for c in chunks ], [ 300, 300, 300, 100 ])
+        for previous, chunk in zip(chunks, chunks[1:]):
+            self.assertEqual(previous.last_state(), chunk.state(0))
+        for chunk in chunks:
+            for i in range(chunk.length()):
+                self.assertEqual(chunk.action(i), pol.action(chunk.state(i)))
+                self.assertIn((chunk.state(i+1), chunk.reward(i)), [ (s, r) for s, p, r in mdp.next_states(chunk.state(i), chunk.action(i)) if p > 0 ])
+        rewards = np.concatenate([ c.rewards() for c in chunks ])
+        self.assertEqual(stats.nb_steps, 1000)
+        self.assertEqual(stats.visits.sum(), 1000)
+        self.assertAlmostEqual(stats.total_reward, rewards.sum())
+        self.assertAlmostEqual(stats.discounted_return, sum(r * .9 ** t for t, r in enumerate(rewards)))
+
+        # the chunk size does not change the trajectory, and the file contains all the steps
+        with tempfile.TemporaryDirectory() as tmp:
+            path  = os.path.join(tmp, 'trace.bin')
+            fstats = simulate_to_file(cmdp, pol, 1000, path, chunk_size=1000, gamma=.9, seed=0)
+            trace = load_trace(path)
+            self.assertEqual(len(trace), 1000)
+            self.assertTrue((trace['reward'] == rewards).all())
+            self.assertTrue((trace['state'] == np.concatenate([ c.state_ids()[:-1] for c in chunks ])).all())
+            self.assertEqual(fstats.last_state, stats.last_state)
+            self.assertTrue((fstats.visits == stats.visits).all())
+
+def main():
+    unittest.main()
+
+if __name__ == "__main__":
+    main()
+
+# eof
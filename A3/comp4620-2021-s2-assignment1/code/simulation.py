@@ -0,0 +1,231 @@
+'''
+  Batched simulation of a policy on a compiled MDP (cf. compiled.py).
+
+  Instead of producing one History at a time (cf. algos.simulate),
+  the trajectories are simulated in lockstep:
+  at each step, the next state of every trajectory is sampled at once.
+
+  A single very long trajectory can also be streamed in chunks (cf. stream_simulate),
+  and written to disk as it is simulated (cf. simulate_to_file), in constant memory.
+'''
+
+import os
+from dataclasses import dataclass
+from multiprocessing import Pool
+from typing import Iterator, Optional, Tuple
+
+import numpy as np
+
+from MDP import MDP, Policy
+from compiled import CompiledMDP
+from history import ArrayHistory
+from vectorized import ArrayPolicy, to_compiled
+
+@dataclass
+class Trajectories:
+    '''
+      The result of a batch simulation.
+      returns[i] is the discounted return of trajectory i;
+      if the trajectories are recorded, states[i,t], actions[i,t] and rewards[i,t]
+      are the state id, action id and reward of trajectory i at step t
+      (states has one more column than actions and rewards).
+    '''
+    cmdp: CompiledMDP
+    returns: np.ndarray
+    states: Optional[np.ndarray] = None
+    actions: Optional[np.ndarray] = None
+    rewards: Optional[np.ndarray] = None
+
+    def nb_trajectories(self) -> int:
+        return len(self.returns)
+
+    def history(self, i: int) -> ArrayHistory:
+        '''
+          The recorded trajectory i, as a history that shares the recorded arrays.
+        '''
+        return ArrayHistory.from_arrays(self.cmdp, self.states[i], self.actions[i], self.rewards[i])
+
+def policy_pairs(cmdp: CompiledMDP, pol: Policy) -> np.ndarray:
+    '''
+      Computes the (state, action) pair selected by the policy in each state of the compiled MDP
+      (-1 for the states without applicable action).
+    '''
+    result = np.full(cmdp.nb_states(), -1, dtype=np.int64)
+    for i in range(cmdp.nb_states()):
+        pairs = cmdp.pairs(i)
+        if len(pairs) == 0:
+            continue
+        if isinstance(pol, ArrayPolicy) and pol.cmdp_ is cmdp:
+            act_id = pol.action_ids_[i]
+        else:
+            act_id = cmdp.action_id(pol.action(cmdp.state(i)))
+        for k in pairs:
+            if cmdp.pair_actions_[k] == act_id:
+                result[i] = k
+    return result
+
+def outcome_keys(cmdp: CompiledMDP) -> np.ndarray:
+    '''
+      Computes a sorted key for each outcome: the index of its pair plus the cumulative
+      (normalised) probability of the outcomes of the pair up to this outcome.
+      Sampling an outcome of pair k then amounts to searching k + u in the keys, with u uniform in [0,1).
+    '''
+    cumulative = np.cumsum(cmdp.probs_)
+    starts     = cmdp.pair_offsets_[:-1]
+    ends       = cmdp.pair_offsets_[1:]
+    with_outcomes = ends > starts
+    before = np.zeros(cmdp.nb_pairs())
+    total  = np.ones(cmdp.nb_pairs())
+    before[with_outcomes] = cumulative[starts[with_outcomes]] - cmdp.probs_[starts[with_outcomes]]
+    total[with_outcomes]  = cumulative[ends[with_outcomes] - 1] - before[with_outcomes]
+    pairs = cmdp.outcome_pairs_
+    return pairs + (cumulative - before[pairs]) / total[pairs]
+
+def simulate_arrays(model: Tuple[np.ndarray, ...], nbsteps: int, nbtrajectories: int, gamma: float, seed, record: bool) -> Tuple[np.ndarray, ...]:
+    '''
+      Simulates nbtrajectories trajectories from state 0 on the arrays of a compiled model
+      (policy pairs, pair offsets, pair actions, successors, rewards, outcome keys).
+      The states without applicable action are absorbing, with a reward of 0.
+    '''
+    pol_pairs, pair_offsets, pair_actions, successors, rewards, keys = model
+    rng     = np.random.default_rng(seed)
+    current = np.zeros(nbtrajectories, dtype=np.int64)
+    returns = np.zeros(nbtrajectories)
+    discount = 1.
+    states_rec  = np.zeros((nbtrajectories, nbsteps + 1), dtype=np.int32) if record else None
+    actions_rec = np.zeros((nbtrajectories, nbsteps), dtype=np.int32) if record else None
+    rewards_rec = np.zeros((nbtrajectories, nbsteps)) if record else None
+
+    for t in range(nbsteps):
+        pairs  = pol_pairs[current]
+        active = pairs >= 0
+        pairs  = np.where(active, pairs, 0)
+        # the outcome is the first one of the pair whose key is at least pair + u
+        outcome = np.searchsorted(keys, pairs + rng.random(nbtrajectories), side='left')
+        outcome = np.clip(outcome, pair_offsets[pairs], pair_offsets[pairs + 1] - 1)
+        step_rewards = np.where(active, rewards[outcome], 0.)
+        returns += discount * step_rewards
+        discount *= gamma
+        if record:
+            states_rec[:, t]  = current
+            actions_rec[:, t] = np.where(active, pair_actions[pairs], -1)
+            rewards_rec[:, t] = step_rewards
+        current = np.where(active, successors[outcome], current)
+
+    if record:
+        states_rec[:, nbsteps] = current
+    return returns, states_rec, actions_rec, rewards_rec
+
+def _simulate_task(args) -> Tuple[np.ndarray, ...]:
+    return simulate_arrays(*args)
+
+def batch_simulate(mdp: MDP, pol: Policy, nbsteps: int, nbtrajectories: int, gamma: float = 1., seed = None, record: bool = True, nbprocesses: int = 1) -> Trajectories:
+    '''
+      Simulates nbtrajectories trajectories of nbsteps steps of the specified policy from the initial state.
+      The trajectories are simulated in lockstep on the compiled version of the MDP.
+      If record is not set, only the discounted returns are kept.
+      If nbprocesses is more than 1, the trajectories are split in as many batches,
+      simulated in a pool of processes with independent random streams derived from the seed.
+    '''
+    cmdp  = to_compiled(mdp)
+    model = (policy_pairs(cmdp, pol), cmdp.pair_offsets_, cmdp.pair_actions_, cmdp.successors_, cmdp.rewards_, outcome_keys(cmdp))
+    if nbprocesses <= 1:
+        return Trajectories(cmdp, *simulate_arrays(model, nbsteps, nbtrajectories, gamma, seed, record))
+
+    sizes = [ nbtrajectories // nbprocesses + (1 if i < nbtrajectories % nbprocesses else 0) for i in range(nbprocesses) ]
+    seeds = np.random.SeedSequence(seed).spawn(nbprocesses)
+    tasks = [ (model, nbsteps, size, gamma, sd, record) for size, sd in zip(sizes, seeds) if size > 0 ]
+    with Pool(len(tasks)) as pool:
+        results = pool.map(_simulate_task, tasks)
+    returns = np.concatenate([ r[0] for r in results ])
+    if not record:
+        return Trajectories(cmdp, returns)
+    return Trajectories(cmdp, returns, *[ np.concatenate([ r[i] for r in results ]) for i in (1, 2, 3) ])
+
+#!------------------------------------------------------------------------------------------------------
+@dataclass
+class RunningStats:
+    '''
+      Aggregates of a streamed trajectory, updated chunk by chunk.
+      visits[i] is the number of steps started in the state with id i;
+      discount is gamma^nb_steps, the discount of the next reward.
+    '''
+    visits: np.ndarray
+    nb_steps: int = 0
+    total_reward: float = 0.
+    discounted_return: float = 0.
+    discount: float = 1.
+    last_state: int = 0
+
+    def update(self, chunk: ArrayHistory, gamma: float) -> None:
+        rewards = chunk.rewards()
+        self.visits            += np.bincount(chunk.state_ids()[:-1], minlength=len(self.visits))
+        self.nb_steps          += chunk.length()
+        self.total_reward      += float(rewards.sum())
+        self.discounted_return += self.discount * float(np.dot(rewards, np.power(gamma, np.arange(len(rewards), dtype=np.float64))))
+        self.discount          *= gamma ** len(rewards)
+        self.last_state         = int(chunk.state_ids()[-1])
+
+def stream_simulate(mdp: MDP, pol: Policy, nbsteps: int, chunk_size: int = 1 << 16, gamma: float = 1., seed = None, stats: Optional[RunningStats] = None) -> Iterator[ArrayHistory]:
+    '''
+      Simulates nbsteps steps of the specified policy from the initial state, on the compiled version of the MDP, 
+      and yields them in chunks of (at most) chunk_size steps: each chunk is an ArrayHistory 
+      that starts in the last state of the previous chunk.
+      The running aggregates are accumulated in stats, if specified (cf. RunningStats).
+      The memory does not depend on nbsteps, as long as the caller does not keep the chunks.
+      As in batch_simulate, the states without applicable action are absorbing, with a reward of 0.
+    '''
+    cmdp      = to_compiled(mdp)
+    pol_pairs = policy_pairs(cmdp, pol)
+    keys      = outcome_keys(cmdp)
+    rng       = np.random.default_rng(seed)
+    current   = 0
+    for start in range(0, nbsteps, chunk_size):
+        n       = min(chunk_size, nbsteps - start)
+        u       = rng.random(n)
+        states  = np.zeros(n + 1, dtype=np.int32)
+        actions = np.full(n, -1, dtype=np.int32)
+        rewards = np.zeros(n)
+        states[0] = current
+        for t in range(n):
+            k = pol_pairs[current]
+            if k >= 0:
+                # cf. simulate_arrays
+                outcome    = min(max(int(np.searchsorted(keys, k + u[t])), cmdp.pair_offsets_[k]), cmdp.pair_offsets_[k+1] - 1)
+                actions[t] = cmdp.pair_actions_[k]
+                rewards[t] = cmdp.rewards_[outcome]
+                current    = cmdp.successors_[outcome]
+            states[t+1] = current
+        chunk = ArrayHistory.from_arrays(cmdp, states, actions, rewards)
+        if stats != None:
+            stats.update(chunk, gamma)
+        yield chunk
+
+STEP_DTYPE = np.dtype([ ('state', '<i4'), ('action', '<i4'), ('reward', '<f8') ])
+
+def simulate_to_file(mdp: MDP, pol: Policy, nbsteps: int, path: str, chunk_size: int = 1 << 16, gamma: float = 1., seed = None) -> RunningStats:
+    '''
+      Simulates nbsteps steps (cf. stream_simulate) and appends each chunk to the specified file as it is simulated, 
+      one STEP_DTYPE record (state id, action id, reward) per step.
+      Returns the running aggregates; the last state of the trajectory is stats.last_state.
+    '''
+    cmdp  = to_compiled(mdp)
+    stats = RunningStats(np.zeros(cmdp.nb_states(), dtype=np.int64))
+    with open(path, 'wb') as output:
+        for chunk in stream_simulate(cmdp, pol, nbsteps, chunk_size, gamma, seed, stats):
+            records = np.empty(chunk.length(), dtype=STEP_DTYPE)
+            records['state']  = chunk.state_ids()[:-1]
+            records['action'] = chunk.action_ids()
+            records['reward'] = chunk.rewards()
+            records.tofile(output)
+    return stats
+
+def load_trace(path: str) -> np.ndarray:
+    '''
+      Memory-maps a file written by simulate_to_file.
+    '''
+    if os.path.getsize(path) == 0:
+        return np.zeros(0, dtype=STEP_DTYPE)
+    return np.memmap(path, dtype=STEP_DTYPE, mode='r')
+
+# eof
@@ -0,0 +1,66 @@
+import unittest
+
+class Test(unittest.TestCase):
+
+    def test(self):
+        import json, os, tempfile
+        from statemachine import SMMDP, SMTransition
+        smmdp = SMMDP([
+              SMTransition('1', 'a1', [ ['2', 1, 3]]),
+              SMTransition('2', 'a1', [ ['3', .5, 5], ['4', .5, 10]]),
+              SMTransition('2', 'a2', [ ['3', 1, 2]]),
+              SMTransition('3', 'a1', [ ['1', .5, 5], ['6', .5, 8]]),
+              SMTransition('3', 'a2', [ ['1', .9, 10], ['7', .1, 0]]),
+              SMTransition('4', 'a1', [ ['5',1,1]]),
+              SMTransition('4', 'a2', [ ['5',.9,10], ['7',.05,0], ['8',.05,0]]),
+              SMTransition('5', 'a1', [ ['6',1,1]]),
+              SMTransition('6', 'a1', [ ['4',1,1]]),
+              SMTransition('7', 'a1', [ ['8',1,0]]),
+              SMTransition('8', 'a1', [ ['7',1,1]]),
+            ], '1'
+          )
+
+        from telemetry import MemoryTelemetry, JSONLTelemetry
+        from algos import value_iteration, policy_iteration
+        from connectedcomp import compute_connected_components
+        from top import topological_vi
+        from nondet import NDPolicy, compute_policy_value
+
+        telemetry = MemoryTelemetry()
+        pol, vivalue = value_iteration(mdp=smmdp, gamma=.9, epsilon=.01, telemetry=telemetry)
+        records = telemetry.records('value_iteration')
+        self.assertEqual([ rec.iteration for rec in records ], list(range(len(records))))
+        self.assertLess(records[-1].residual, .01)
+        self.assertGreaterEqual(records[-2].residual, .01)
+        for rec in records:
+            self.assertEqual(rec.nb_backups, 8)
+            self.assertEqual(rec.nb_next_states, 11) # one call per pair state/action
+        self.assertTrue(all(r1.wall_time <= r2.wall_time for r1, r2 in zip(records, records[1:])))
+
+        policy_iteration(smmdp, gamma=.9, epsilon=.01, stopping_threshold=.01, telemetry=telemetry)
+        self.assertGreater(len(telemetry.records('policy_iteration')), 0)
+        self.assertGreater(len(telemetry.records('compute_v_of_policy')), len(telemetry.records('policy_iteration')))
+
+        graph = compute_connected_components(smmdp)
+        topological_vi(smmdp, gamma=.9, epsilon=.01, graph=graph, telemetry=telemetry)
+        self.assertEqual(len(telemetry.records('topological_vi')), graph.nb_components())
+
+        ndpol = NDPolicy()
+        ndpol.add_det_policy(mdp=smmdp, pol=pol)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'telemetry.jsonl')
+            with JSONLTelemetry(path) as sink:
+                compute_policy_value(smmdp, ndpol, gamma=.9, epsilon=.01, max_iteration=1000, telemetry=sink)
+            with open(path) as input:
+                lines = [ json.loads(line) for line in input ]
+        self.assertGreater(len(lines), 0)
+        self.assertEqual(lines[0]['solver'], 'compute_policy_value')
+        self.assertEqual(lines[0]['nb_backups'], 8)
+
+def main():
+    unittest.main()
+
+if __name__ == "__main__":
+    main()
+
+# eof
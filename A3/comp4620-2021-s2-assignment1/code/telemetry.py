@@ -0,0 +1,154 @@
+'''
+  Per-iteration telemetry of the solvers.
+
+  A solver that receives a Telemetry object reports an IterationRecord
+  after each of its iterations (or after each SCC for topological_vi).
+  MemoryTelemetry keeps the records in a list, JSONLTelemetry writes them to a JSON Lines file.
+'''
+
+import json
+import sys
+import time
+import tracemalloc
+from dataclasses import dataclass, asdict
+from typing import List, Optional, Tuple
+
+from MDP import Action, MDP, State
+
+try:
+    import resource
+except ImportError: # not available on Windows
+    resource = None
+
+@dataclass
+class IterationRecord:
+    '''
+      solver: the name of the solver;
+      iteration: the index of the iteration (of the SCC for topological_vi), starting at 0;
+      residual: the residual of the iteration, as used by the stopping test of the solver;
+      wall_time: the time in seconds since the solver started;
+      nb_next_states: the number of calls to mdp.next_states() during the iteration;
+      nb_backups: the number of states backed up during the iteration;
+      peak_memory: the peak memory of the process so far, in bytes
+      (the peak traced by tracemalloc if it is tracing, the peak resident set size otherwise).
+    '''
+    solver: str
+    iteration: int
+    residual: float
+    wall_time: float
+    nb_next_states: int
+    nb_backups: int
+    peak_memory: Optional[int]
+
+class Telemetry:
+    '''
+        The interface for a telemetry sink.
+    '''
+    def record(self, rec: IterationRecord) -> None:
+        print(f'{type(self).__name__} record function not implemented')
+
+class MemoryTelemetry(Telemetry):
+    '''
+      Keeps the records in memory.
+    '''
+    def __init__(self):
+        self.records_: List[IterationRecord] = []
+
+    def record(self, rec: IterationRecord) -> None:
+        self.records_.append(rec)
+
+    def records(self, solver: Optional[str] = None) -> List[IterationRecord]:
+        return [ rec for rec in self.records_ if solver is None or rec.solver == solver ]
+
+class JSONLTelemetry(Telemetry):
+    '''
+      Appends each record as a JSON object on its own line of the specified file.
+    '''
+    def __init__(self, path: str):
+        self.file_ = open(path, 'a')
+
+    def record(self, rec: IterationRecord) -> None:
+        self.file_.write(json.dumps(asdict(rec)) + '\n')
+        self.file_.flush()
+
+    def close(self) -> None:
+        self.file_.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+def peak_memory() -> Optional[int]:
+    if tracemalloc.is_tracing():
+        return tracemalloc.get_traced_memory()[1]
+    if resource is None:
+        return None
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return maxrss if sys.platform == 'darwin' else maxrss * 1024 # bytes on macOS, kilobytes elsewhere
+
+class CountingMDP(MDP):
+    '''
+      An MDP equivalent to the specified MDP that counts the calls to next_states().
+      The calls to reward_free_transitions() of a compiled MDP (cf. compiled.py) are forwarded and counted as well.
+    '''
+    def __init__(self, mdp: MDP):
+        self.mdp_            = mdp
+        self.nb_next_states_ = 0
+        if hasattr(mdp, 'reward_free_transitions'):
+            self.reward_free_transitions = self.counted_reward_free_transitions
+
+    def states(self) -> List[State]:
+        return self.mdp_.states()
+
+    def actions(self) -> List[Action]:
+        return self.mdp_.actions()
+
+    def applicable_actions(self, s: State) -> List[Action]:
+        return self.mdp_.applicable_actions(s)
+
+    def next_states(self, s: State, a: Action) -> List[Tuple[State,float,float]]:
+        self.nb_next_states_ += 1
+        return self.mdp_.next_states(s, a)
+
+    def initial_state(self) -> State:
+        return self.mdp_.initial_state()
+
+    def counted_reward_free_transitions(self, s: State, a: Action) -> Tuple[float, List[Tuple[State, float]]]:
+        self.nb_next_states_ += 1
+        return self.mdp_.reward_free_transitions(s, a)
+
+class SolverMonitor:
+    '''
+      Used by a solver to report its iterations to a telemetry sink (if any).
+      The solver should query the MDP returned by mdp(), so that the calls to next_states() are counted.
+    '''
+    def __init__(self, solver: str, mdp: MDP, telemetry: Optional[Telemetry]):
+        self.solver_    = solver
+        self.telemetry_ = telemetry
+        self.mdp_       = mdp if telemetry is None else CountingMDP(mdp)
+        self.iteration_ = 0
+        self.start_     = time.perf_counter()
+        self.last_nb_next_states_ = 0
+
+    def mdp(self) -> MDP:
+        return self.mdp_
+
+    def active(self) -> bool:
+        return not self.telemetry_ is None
+
+    def iteration(self, residual: float, nb_backups: int) -> None:
+        '''
+          Reports the end of an iteration.
+        '''
+        if self.telemetry_ is None:
+            return
+        nb_next_states = self.mdp_.nb_next_states_ - self.last_nb_next_states_
+        self.last_nb_next_states_ = self.mdp_.nb_next_states_
+        self.telemetry_.record(IterationRecord(
+            self.solver_, self.iteration_, float(residual), time.perf_counter() - self.start_,
+            nb_next_states, nb_backups, peak_memory()))
+        self.iteration_ += 1
+
+# eof
@@ -0,0 +1,35 @@
+import unittest
+
+class Test(unittest.TestCase):
+
+    def test(self):
+        from statemachine import SMMDP, SMTransition
+
+        # 0 -a-> 1 (1 loops with reward 1), 0 -b-> 2 (2 loops with reward 0)
+        smmdp = SMMDP([
+              SMTransition('0', 'a', [ ['1', 1, 0]]),
+              SMTransition('0', 'b', [ ['2', 1, 2]]),
+              SMTransition('1', 'a', [ ['1', 1, 1]]),
+              SMTransition('2', 'a', [ ['2', 1, 0]]),
+            ], '0'
+          )
+
+        from connectedcomp import compute_connected_components
+        from top import topological_vi
+        graph = compute_connected_components(smmdp)
+        for rule in ('difference', 'epsilon_optimal'):
+            topvalue = topological_vi(smmdp, gamma=.9, epsilon=.001, graph=graph, stopping_rule=rule)
+            for name, value in [ ('0', 9), ('1', 10), ('2', 0) ]:
+                self.assertAlmostEqual(topvalue.value(smmdp.get_state(name)), value, delta=.05)
+
+        # a single-state component has a span of 0 after the first backup
+        with self.assertRaises(ValueError):
+            topological_vi(smmdp, gamma=.9, epsilon=.001, graph=graph, stopping_rule='span')
+
+def main():
+    unittest.main()
+
+if __name__ == "__main__":
+    main()
+
+# eof
\ No newline at end of file
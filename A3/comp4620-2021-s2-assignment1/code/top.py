@@ -1,9 +1,21 @@
-from typing import Set, List
-from algos import ExplicitStateValueFunction, StateValueFunction, ActionValueFunction, ExplicitActionValueFunction, one_step_lookahead, greedy_action, compute_q_from_v, greedy_policy
+from typing import Optional
+from algos import ExplicitStateValueFunction, greedy_lookahead, ConvergenceCheck
 from MDP import State, MDP
 from connectedcomp import CCGraph
+from telemetry import Telemetry, SolverMonitor
 
-def topological_vi(mdp: MDP, gamma: float, epsilon: float, graph: CCGraph) -> ExplicitStateValueFunction:
+def topological_vi(mdp: MDP, gamma: float, epsilon: float, graph: CCGraph, stopping_rule: str = 'difference', telemetry: Optional[Telemetry] = None) -> ExplicitStateValueFunction:
+    '''
+      Performs value iteration on each strongly connected component, from the leaves to the root.
+      The iterations on a component stop according to the specified stopping rule (cf. algos.ConvergenceCheck), 
+      except 'span': the values of a component feed the components upstream, so they must be precise, 
+      and the span of a single-state component is 0 after the first backup.
+      Each component is reported to the telemetry sink, if any, with its last residual.
+    '''
+    if stopping_rule == 'span':
+        raise ValueError('The span stopping rule does not bound the values of a component, it can not be used by topological_vi')
+    monitor      = SolverMonitor('topological_vi', mdp, telemetry)
+    mdp          = monitor.mdp()
     root         = [scc for scc in graph.roots()][0]
     SCC_index    = graph.nb_components() - 1
     SCCToId_dict = {root : SCC_index}
@@ -19,30 +31,27 @@ def topological_vi(mdp: MDP, gamma: float, epsilon: float, graph: CCGraph) -> Ex
     
     IdToSCC_dict = {id : scc for scc, id in SCCToId_dict.items()}
     SCC_vs       = ExplicitStateValueFunction()
+    check        = ConvergenceCheck(stopping_rule, epsilon, gamma)
         
     for i in range(SCC_index + 1):
         SCC_i = IdToSCC_dict[i]
         #! value_iteration(mdp, gamma, epsilon)
+        nb_backups = 0
         while True:
-            #! q = compute_q_from_v(mdp, SCC_vs, gamma)
-            q = ExplicitActionValueFunction()
+            #! bellman_backup(mdp, SCC_vs, gamma) restricted to the SCC, without building q
+            check.start(SCC_vs)
+            newvs = []
             for s in SCC_i.states():
-                for a in mdp.applicable_actions(s):
-                    q.set_value(s, a, one_step_lookahead(mdp, SCC_vs, gamma, s, a))        
-            #! greedy_policy(mdp, q)
-            newvs = ExplicitStateValueFunction()
-            for s in SCC_i.states():
-                _, val = greedy_action(mdp, q, s)
-                newvs.set_value(s, val)
-            #! state_value_difference(mdp, SCC_vs, newvs)    
-            diff = max([abs(SCC_vs.value(s) - newvs.value(s)) for s in SCC_i.states()])
-            if diff < epsilon:
-                for s in SCC_i.states():
-                    SCC_vs.set_value(s, newvs.value(s))
+                _, val = greedy_lookahead(mdp, SCC_vs, gamma, s)
+                newvs.append(val)
+                check.update(s, val)
+
+            for s, val in zip(SCC_i.states(), newvs):
+                SCC_vs.set_value(s, val)
+            nb_backups += check.nb_updates()
+            if check.converged():
                 break
-            
-            for s in SCC_i.states():
-                SCC_vs.set_value(s, newvs.value(s))
+        monitor.iteration(check.residual(), nb_backups)
         
     return SCC_vs
         
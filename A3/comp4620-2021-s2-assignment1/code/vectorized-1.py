@@ -0,0 +1,40 @@
+import unittest
+
+class Test(unittest.TestCase):
+
+    def test(self):
+        from map import basic_map, DungeonMDP
+        from example1 import example_1
+        from example2 import example_2
+        from algos import value_iteration
+        from vectorized import vectorized_value_iteration
+
+        for mdp in [ example_1(), example_2(), DungeonMDP(basic_map()) ]:
+            pol, vivalue = value_iteration(mdp=mdp, gamma=.9, epsilon=.001)
+            vpol, vvalue = vectorized_value_iteration(mdp=mdp, gamma=.9, epsilon=.001)
+            for state in mdp.states():
+                self.assertAlmostEqual(vivalue.value(state), vvalue.value(state), delta=.01)
+                self.assertAlmostEqual(vivalue.value(state),
+                                       sum(p * (r + .9 * vivalue.value(s)) for s, p, r in mdp.next_states(state, vpol.action(state))),
+                                       delta=.01)
+
+        # a state without applicable action has no action in the policy
+        from statemachine import SMMDP, SMTransition
+        chain = SMMDP([
+              SMTransition('0', 'a', [ ['1', 1, -1]]),
+              SMTransition('1', 'a', [ ['g', 1, -1]]),
+              SMTransition('1', 'b', [ ['0', 1, -5]]),
+            ], '0'
+          )
+        vpol, vvalue = vectorized_value_iteration(mdp=chain, gamma=.9, epsilon=.0001)
+        self.assertIsNone(vpol.action(chain.get_state('g')))
+        self.assertEqual(vpol.action(chain.get_state('1')), chain.get_action('a'))
+        self.assertAlmostEqual(vvalue.value(chain.get_state('0')), -1.9)
+
+def main():
+    unittest.main()
+
+if __name__ == "__main__":
+    main()
+
+# eof
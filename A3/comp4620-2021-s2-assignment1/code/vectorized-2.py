@@ -0,0 +1,26 @@
+import unittest
+
+class Test(unittest.TestCase):
+
+    def test(self):
+        from map import basic_map, DungeonMDP
+        from example1 import example_1
+        from vectorized import vectorized_value_iteration, multi_discount_value_iteration
+
+        for mdp in [ example_1(), DungeonMDP(basic_map()) ]:
+            gammas  = [ .5, .9, .99 ]
+            results = multi_discount_value_iteration(mdp, gammas, epsilon=.0001)
+            self.assertEqual(len(results), 3)
+            for gamma, (mpol, mvalue) in zip(gammas, results):
+                vpol, vvalue = vectorized_value_iteration(mdp=mdp, gamma=gamma, epsilon=.0001)
+                for state in mdp.states():
+                    self.assertAlmostEqual(vvalue.value(state), mvalue.value(state))
+                    self.assertEqual(vpol.action(state), mpol.action(state))
+
+def main():
+    unittest.main()
+
+if __name__ == "__main__":
+    main()
+
+# eof
@@ -0,0 +1,61 @@
+import unittest
+
+class Test(unittest.TestCase):
+
+    def test(self):
+        import numpy as np
+        from example2 import example_2
+        from compiled import CompiledMDP
+        import algos
+        from vectorized import ArrayStateValueFunction, ArrayActionValueFunction, compute_q_from_v
+
+        mdp  = example_2()
+        cmdp = CompiledMDP(mdp)
+
+        pol, vivalue = algos.value_iteration(mdp=mdp, gamma=.9, epsilon=.0001)
+        avalue = ArrayStateValueFunction(cmdp)
+        avalue.bulk_set_value(cmdp.states(), np.array([ vivalue.value(s) for s in cmdp.states() ]))
+        self.assertEqual(avalue.value('unknown'), 0)
+        self.assertEqual(len(avalue.values_), cmdp.nb_states())
+
+        # array-backed value functions can be used by the algorithms of algos.py
+        q  = algos.compute_q_from_v(cmdp, avalue, .9)
+        aq = compute_q_from_v(cmdp, avalue, .9)
+        self.assertIsInstance(aq, ArrayActionValueFunction)
+        for s in cmdp.states():
+            for a in cmdp.applicable_actions(s):
+                self.assertAlmostEqual(q.value(s, a), aq.value(s, a))
+        self.assertTrue(np.allclose(aq.bulk_value([ (0, 'hunt'), (3, 'nohunt') ]), [ q.value(0, 'hunt'), q.value(3, 'nohunt') ]))
+        self.assertEqual(aq.value(0, 'unknown'), 0)
+
+        # the bulk accessors agree with value and set_value on unknown states and pairs
+        self.assertEqual(list(aq.bulk_value([ (0, 'unknown'), (0, 'hunt') ])), [ 0, q.value(0, 'hunt') ])
+        self.assertEqual(list(avalue.bulk_value([ 'unknown', 0 ])), [ 0, avalue.value(0) ])
+        last = aq.values_[-1]
+        with self.assertRaises(KeyError):
+            aq.bulk_set_value([ (0, 'unknown') ], np.array([ 1000. ]))
+        self.assertEqual(aq.values_[-1], last)
+
+        gpol, gvalue   = algos.greedy_policy(cmdp, q)
+        agpol, agvalue = algos.greedy_policy(cmdp, aq)
+        for s in cmdp.states():
+            self.assertEqual(gpol.action(s), agpol.action(s))
+            self.assertAlmostEqual(gvalue.value(s), agvalue.value(s))
+        self.assertTrue(algos.is_policy_nearly_greedy(cmdp, agpol, .0001, aq))
+        pivalue = algos.compute_v_of_policy(cmdp, agpol, .9, .0001, starting_value=agvalue)
+        for s in cmdp.states():
+            self.assertAlmostEqual(vivalue.value(s), pivalue.value(s), delta=.01)
+
+        # reading a default value does not store it
+        value = algos.ExplicitStateValueFunction()
+        self.assertEqual(value.value(0), 0)
+        self.assertEqual(len(value._explicit_value), 0)
+        self.assertEqual(algos.ExplicitActionValueFunction().value(0, 'hunt'), 0)
+
+def main():
+    unittest.main()
+
+if __name__ == "__main__":
+    main()
+
+# eof
@@ -0,0 +1,50 @@
+import unittest
+
+class Test(unittest.TestCase):
+
+    def test(self):
+        import numpy as np
+        from map import basic_map, DungeonMDP
+        from example1 import example_1
+        from example2 import example_2
+        from compiled import CompiledMDP
+        from algos import value_iteration, compute_v_of_policy, greedy_policy, same_policy
+        from vectorized import ArrayPolicy, ArrayActionValueFunction, vectorized_policy_iteration, compute_q_vector, csr_rows
+
+        for mdp in [ example_1(), example_2(), DungeonMDP(basic_map()) ]:
+            cmdp = CompiledMDP(mdp)
+            _, vivalue = value_iteration(mdp=cmdp, gamma=.9, epsilon=.0001)
+            pol = vectorized_policy_iteration(mdp, gamma=.9, epsilon=.0001, stopping_threshold=.0001)
+            self.assertIsInstance(pol, ArrayPolicy)
+            pivalue = compute_v_of_policy(cmdp, pol, .9, .0001, method='direct')
+            for state in mdp.states():
+                self.assertAlmostEqual(vivalue.value(state), pivalue.value(state), delta=.01)
+
+        # the greedy policy of an array action value function is an array policy that reports its changes
+        cmdp = CompiledMDP(example_1())
+        q = ArrayActionValueFunction(cmdp, compute_q_vector(cmdp, np.zeros(cmdp.nb_states()), .9))
+        pol1, _ = greedy_policy(cmdp, q)
+        pol2 = ArrayPolicy(cmdp, pol1.action_ids_.copy())
+        self.assertEqual(len(pol2.changed_states(pol1)), 0)
+        self.assertTrue(same_policy(cmdp, pol1, pol2))
+        other = [ a for a in cmdp.applicable_actions(cmdp.state(2)) if a != pol1.action(cmdp.state(2)) ][0]
+        pol2.action_ids_[2] = cmdp.action_id(other)
+        self.assertEqual(list(pol2.changed_states(pol1)), [ 2 ])
+        self.assertFalse(same_policy(cmdp, pol1, pol2))
+        from MDP import ExplicitPolicy
+        explicit_pol = ExplicitPolicy(cmdp)
+        for state in cmdp.states():
+            explicit_pol.set_action(state, pol1.action(state))
+        self.assertEqual(list(pol2.changed_states(explicit_pol)), [ 2 ])
+
+        owners, indices = csr_rows(np.array([ 0, 2, 2, 5 ]), np.array([ 2, 0 ]))
+        self.assertEqual(list(owners), [ 0, 0, 0, 1, 1 ])
+        self.assertEqual(list(indices), [ 2, 3, 4, 0, 1 ])
+
+def main():
+    unittest.main()
+
+if __name__ == "__main__":
+    main()
+
+# eof
@@ -0,0 +1,62 @@
+import unittest
+
+class Test(unittest.TestCase):
+
+    def test(self):
+        import numpy as np
+        from example1 import example_1
+        from map import basic_map, DungeonMDP
+        from compiled import CompiledMDP
+        from algos import simulate_time_dependent, one_step_lookahead, ExplicitStateValueFunction
+        from vectorized import finite_horizon_value_iteration, action_dtype
+
+        for mdp in [ example_1(), DungeonMDP(basic_map()) ]:
+            cmdp = CompiledMDP(mdp)
+            sol  = finite_horizon_value_iteration(cmdp, horizon=5, gamma=.9)
+            self.assertEqual(sol.action_ids.shape, (5, cmdp.nb_states()))
+            self.assertEqual(sol.action_ids.dtype, np.int8)
+
+            # backward induction with the object-based lookahead
+            v = ExplicitStateValueFunction()
+            for t in reversed(range(5)):
+                newv = ExplicitStateValueFunction()
+                for s in cmdp.states():
+                    newv.set_value(s, max(one_step_lookahead(cmdp, v, .9, s, a) for a in cmdp.applicable_actions(s)))
+                    self.assertAlmostEqual(one_step_lookahead(cmdp, v, .9, s, sol.action(s, t)), newv.value(s))
+                    self.assertAlmostEqual(sol.value(s, t), newv.value(s))
+                v = newv
+
+            light = finite_horizon_value_iteration(cmdp, horizon=5, gamma=.9, memory_light=True)
+            self.assertEqual(light.stored_steps(), 1)
+            self.assertTrue((light.action_ids[0] == sol.action_ids[0]).all())
+            self.assertTrue(np.allclose(light.values[0], sol.values[0]))
+            for accessor in (light.action, light.value):
+                with self.assertRaises(ValueError):
+                    accessor(cmdp.initial_state(), 1)
+            for accessor in (light.policy, light.value_function, sol.policy, sol.value_function):
+                with self.assertRaises(ValueError):
+                    accessor(-1)
+            self.assertEqual(sol.value(cmdp.initial_state(), 5), 0)
+            with self.assertRaises(ValueError):
+                sol.action(cmdp.initial_state(), 5)
+
+            h = simulate_time_dependent(cmdp, sol, 5)
+            self.assertEqual(h.length(), 5)
+            for t in range(5):
+                self.assertEqual(h.action(t), sol.action(h.state(t), t))
+            self.assertEqual(sol.policy(0).action(cmdp.initial_state()), sol.action(cmdp.initial_state(), 0))
+            self.assertEqual(sol.value_function(0).value(cmdp.initial_state()), sol.value(cmdp.initial_state()))
+
+        self.assertEqual(action_dtype(127), np.int8)
+        self.assertEqual(action_dtype(128), np.int16)
+        self.assertEqual(action_dtype(40000), np.int32)
+        with self.assertRaises(ValueError):
+            finite_horizon_value_iteration(example_1(), horizon=0)
+
+def main():
+    unittest.main()
+
+if __name__ == "__main__":
+    main()
+
+# eof
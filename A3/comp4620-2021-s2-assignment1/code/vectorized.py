@@ -0,0 +1,397 @@
+'''
+  Vectorized versions of the algorithms of algos.py.
+
+  These algorithms work on a CompiledMDP (cf. compiled.py):
+  a state value function is a vector indexed by state ids,
+  and an action value function is a vector indexed by (state, action) pairs.
+  The results are still returned as Policy and StateValueFunction objects
+  so that they can be used in place of the results of algos.py.
+'''
+
+from dataclasses import dataclass
+from typing import List, Optional, Tuple, Union
+
+import numpy as np
+
+from MDP import Action, MDP, State, Policy
+from algos import StateValueFunction, ActionValueFunction
+from compiled import CompiledMDP
+
+class ArrayStateValueFunction(StateValueFunction):
+    '''
+      A value function represented as a vector indexed by the ids of the states of a compiled MDP.
+      The value of a state unknown to the compiled MDP is 0.
+    '''
+    def __init__(self, cmdp: CompiledMDP, values: Optional[np.ndarray] = None):
+        self.cmdp_   = cmdp
+        self.values_ = np.zeros(cmdp.nb_states()) if values is None else values
+
+    def set_value(self, s: State, v: float):
+        self.values_[self.cmdp_.state_id(s)] = v
+
+    def value(self, s: State) -> float:
+        i = self.cmdp_.state_ids_.get(s)
+        return 0. if i is None else float(self.values_[i])
+
+    def bulk_value(self, states: List[State]) -> np.ndarray:
+        ids = np.array([ self.cmdp_.state_ids_.get(s, -1) for s in states ], dtype=np.int64)
+        return np.where(ids >= 0, self.values_[np.maximum(ids, 0)], 0.)
+
+    def bulk_set_value(self, states: List[State], values: np.ndarray) -> None:
+        self.values_[[ self.cmdp_.state_id(s) for s in states ]] = values
+
+class ArrayActionValueFunction(ActionValueFunction):
+    '''
+      An action value function represented as a vector indexed by the (state, action) pairs of a compiled MDP.
+      The value of a pair unknown to the compiled MDP is 0.
+    '''
+    def __init__(self, cmdp: CompiledMDP, values: Optional[np.ndarray] = None):
+        self.cmdp_   = cmdp
+        self.values_ = np.zeros(cmdp.nb_pairs()) if values is None else values
+
+    def pair(self, s: State, a: Action) -> int:
+        '''
+          The index of the specified pair, -1 if it is unknown.
+        '''
+        i      = self.cmdp_.state_ids_.get(s)
+        act_id = self.cmdp_.action_ids_.get(a)
+        if i is None or act_id is None:
+            return -1
+        for k in self.cmdp_.pairs(i):
+            if self.cmdp_.pair_actions_[k] == act_id:
+                return k
+        return -1
+
+    def set_value(self, s: State, a: Action, v: float):
+        k = self.pair(s, a)
+        if k < 0:
+            raise KeyError(f'{a} is not applicable in {s}')
+        self.values_[k] = v
+
+    def value(self, s: State, a: Action) -> float:
+        k = self.pair(s, a)
+        return 0. if k < 0 else float(self.values_[k])
+
+    def bulk_value(self, pairs: List[Tuple[State, Action]]) -> np.ndarray:
+        indices = np.array([ self.pair(s, a) for s, a in pairs ], dtype=np.int64)
+        return np.where(indices >= 0, self.values_[np.maximum(indices, 0)], 0.)
+
+    def bulk_set_value(self, pairs: List[Tuple[State, Action]], values: np.ndarray) -> None:
+        indices = [ self.pair(s, a) for s, a in pairs ]
+        for (s, a), k in zip(pairs, indices):
+            if k < 0:
+                raise KeyError(f'{a} is not applicable in {s}')
+        self.values_[indices] = values
+
+    def greedy_policy(self) -> Tuple[Policy, StateValueFunction]:
+        '''
+          Computes the greedy policy and its state value function in bulk (cf. algos.greedy_policy).
+        '''
+        pairs, values = greedy_pairs(self.cmdp_, self.values_)
+        return ArrayPolicy(self.cmdp_, pair_actions(self.cmdp_, pairs)), ArrayStateValueFunction(self.cmdp_, values)
+
+class ArrayPolicy(Policy):
+    '''
+      A DM Policy represented as a vector that contains the id of the action selected in each state 
+      (-1 for the states without applicable action, for which action returns None).
+    '''
+    def __init__(self, cmdp: CompiledMDP, action_ids: np.ndarray):
+        self.cmdp_       = cmdp
+        self.action_ids_ = action_ids
+
+    def action(self, s: State) -> Action:
+        act_id = self.action_ids_[self.cmdp_.state_id(s)]
+        return None if act_id < 0 else self.cmdp_.action(act_id)
+
+    def changed_states(self, previous: Policy) -> np.ndarray:
+        '''
+          The ids of the states in which this policy selects another action than the previous policy.
+          The comparison is a single vector comparison if previous is an ArrayPolicy of the same compiled MDP.
+        '''
+        if isinstance(previous, ArrayPolicy) and previous.cmdp_ is self.cmdp_:
+            return np.flatnonzero(self.action_ids_ != previous.action_ids_)
+        return np.array([ i for i in range(self.cmdp_.nb_states()) 
+                          if self.action_ids_[i] >= 0 and previous.action(self.cmdp_.state(i)) != self.cmdp_.action(self.action_ids_[i]) ], dtype=np.int64)
+
+def to_compiled(mdp: MDP) -> CompiledMDP:
+    '''
+      Compiles the specified MDP unless it is already compiled.
+    '''
+    return mdp if isinstance(mdp, CompiledMDP) else CompiledMDP(mdp)
+
+def compute_q_vector(cmdp: CompiledMDP, v: np.ndarray, gamma: float) -> np.ndarray:
+    '''
+      Computes the one-step lookahead value of every (state, action) pair of the compiled MDP, as R + gamma P v:
+      the expected value of the successors of each pair is gathered and summed per pair, 
+      and added to the precomputed expected reward of the pair.
+    '''
+    expected_values = np.bincount(cmdp.outcome_pairs_, weights=cmdp.probs_ * v[cmdp.successors_], minlength=cmdp.nb_pairs())
+    return cmdp.expected_rewards_ + gamma * expected_values
+
+def segmented_argmax(q: np.ndarray, state_offsets: np.ndarray, pair_states: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    '''
+      Computes, for each segment state_offsets[i] .. state_offsets[i+1]-1 of q,
+      the index of its first maximal element and this maximal value.
+      pair_states gives the segment of each element of q.
+      Empty segments get the index -1 and the value 0.
+      If q is a matrix, each column is processed independently.
+    '''
+    nb_states   = len(state_offsets) - 1
+    best_pairs  = np.full((nb_states,) + q.shape[1:], -1, dtype=np.int64)
+    best_values = np.zeros((nb_states,) + q.shape[1:])
+    with_pairs  = np.diff(state_offsets) > 0
+    if not with_pairs.any():
+        return best_pairs, best_values
+    # the pairs of the states with applicable actions are contiguous: a segmented reduction is enough
+    starts = state_offsets[:-1][with_pairs] - state_offsets[0]
+    best_values[with_pairs] = np.maximum.reduceat(q, starts, axis=0)
+    indices    = np.arange(len(q)).reshape((-1,) + (1,) * (q.ndim - 1))
+    candidates = np.where(q >= best_values[pair_states], indices, len(q))
+    best_pairs[with_pairs] = np.minimum.reduceat(candidates, starts, axis=0) + state_offsets[0]
+    return best_pairs, best_values
+
+def greedy_pairs(cmdp: CompiledMDP, q: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    '''
+      Computes, for each state, the index of its greedy pair (the first pair with maximal value)
+      and the value of this pair.
+      States without applicable action get the pair -1 and the value 0.
+    '''
+    return segmented_argmax(q, cmdp.state_offsets_, cmdp.pair_states_)
+
+def pair_actions(cmdp: CompiledMDP, pairs: np.ndarray) -> np.ndarray:
+    '''
+      The action ids of the specified pairs (-1 is kept as -1).
+    '''
+    return np.where(pairs >= 0, cmdp.pair_actions_[pairs], -1)
+
+def compute_q_from_v(cmdp: CompiledMDP, v: StateValueFunction, gamma: float) -> ArrayActionValueFunction:
+    '''
+      Computes the action value function as a one-step lookahead value of the specified state value function
+      (cf. algos.compute_q_from_v).
+    '''
+    if isinstance(v, ArrayStateValueFunction) and v.cmdp_ is cmdp:
+        values = v.values_
+    else:
+        values = np.array([ v.value(s) for s in cmdp.states() ], dtype=np.float64)
+    return ArrayActionValueFunction(cmdp, compute_q_vector(cmdp, values, gamma))
+
+def vectorized_bellman_backup(cmdp: CompiledMDP, v: np.ndarray, gamma: float) -> Tuple[np.ndarray, np.ndarray]:
+    '''
+      Performs the Bellman backup of the specified value vector.
+      Returns the greedy pair of each state and the new value vector.
+    '''
+    return greedy_pairs(cmdp, compute_q_vector(cmdp, v, gamma))
+
+def vectorized_value_iteration(mdp: MDP, gamma: float, epsilon: float) -> Tuple[Policy, StateValueFunction]:
+    '''
+      Performs the value iteration algorithm on the compiled version of the specified MDP.
+      Same contract as algos.value_iteration.
+    '''
+    cmdp = to_compiled(mdp)
+    vs   = np.zeros(cmdp.nb_states())
+    while True:
+        pairs, newvs = vectorized_bellman_backup(cmdp, vs, gamma)
+        diff = np.abs(newvs - vs).max(initial=0)
+        if diff < epsilon:
+            return ArrayPolicy(cmdp, pair_actions(cmdp, pairs)), ArrayStateValueFunction(cmdp, newvs)
+        vs = newvs
+
+def compute_q_matrix(cmdp: CompiledMDP, v: np.ndarray, gammas: np.ndarray) -> np.ndarray:
+    '''
+      Computes the one-step lookahead value of every (state, action) pair (rows)
+      for several value vectors (columns of v), column j being discounted by gammas[j].
+    '''
+    expected_values = np.zeros((cmdp.nb_pairs(), v.shape[1]))
+    with_outcomes   = np.diff(cmdp.pair_offsets_) > 0
+    if with_outcomes.any():
+        expected_values[with_outcomes] = np.add.reduceat(cmdp.probs_[:, None] * v[cmdp.successors_], cmdp.pair_offsets_[:-1][with_outcomes], axis=0)
+    return cmdp.expected_rewards_[:, None] + gammas[None, :] * expected_values
+
+def multi_discount_value_iteration(mdp: MDP, gammas: List[float], epsilon: Union[float, List[float]]) -> List[Tuple[Policy, StateValueFunction]]:
+    '''
+      Performs the value iteration algorithm for several discount factors at once.
+      The values are stored in a matrix with one column per discount factor,
+      and each backup updates all the columns in a single pass over the model.
+      A column is retired as soon as it has converged (epsilon can be specified per discount factor).
+      Returns the policy and the value for each discount factor, in the order of gammas.
+    '''
+    cmdp     = to_compiled(mdp)
+    gammas   = np.array(gammas, dtype=np.float64)
+    epsilons = np.broadcast_to(np.array(epsilon, dtype=np.float64), gammas.shape)
+    result   = [ None ] * len(gammas)
+    active   = np.arange(len(gammas))
+    vs       = np.zeros((cmdp.nb_states(), len(gammas)))
+    while len(active) > 0:
+        pairs, newvs = greedy_pairs(cmdp, compute_q_matrix(cmdp, vs, gammas[active]))
+        diffs = np.abs(newvs - vs).max(axis=0, initial=0)
+        done  = diffs < epsilons[active]
+        for j in np.flatnonzero(done):
+            result[active[j]] = (ArrayPolicy(cmdp, pair_actions(cmdp, pairs[:, j])), ArrayStateValueFunction(cmdp, newvs[:, j].copy()))
+        active = active[~done]
+        vs     = newvs[:, ~done]
+    return result
+
+def csr_rows(offsets: np.ndarray, rows: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    '''
+      Gathers the elements of the specified rows of a CSR layout (row i is offsets[i] .. offsets[i+1]-1).
+      Returns, for each element, the position of its row in rows, and its index.
+    '''
+    starts  = offsets[rows]
+    lengths = offsets[rows + 1] - starts
+    owners  = np.repeat(np.arange(len(rows)), lengths)
+    indices = np.arange(lengths.sum()) + np.repeat(starts - (np.cumsum(lengths) - lengths), lengths)
+    return owners, indices
+
+def compute_predecessor_index(cmdp: CompiledMDP) -> Tuple[np.ndarray, np.ndarray]:
+    '''
+      Computes the predecessors of each state, in a CSR layout:
+      the pairs that can lead to state i are pred_pairs[pred_offsets[i] .. pred_offsets[i+1]-1].
+    '''
+    order        = np.argsort(cmdp.successors_, kind='stable')
+    pred_pairs   = cmdp.outcome_pairs_[order]
+    pred_offsets = np.searchsorted(cmdp.successors_[order], np.arange(cmdp.nb_states() + 1))
+    return pred_offsets, pred_pairs
+
+def policy_ancestors(cmdp: CompiledMDP, pairs: np.ndarray, states: np.ndarray, predecessors: Tuple[np.ndarray, np.ndarray]) -> np.ndarray:
+    '''
+      The ids of the states that can reach one of the specified states when following the policy given by pairs 
+      (the pair selected in each state), including these states.
+      The work is proportional to the number of predecessor links of the result.
+    '''
+    pred_offsets, pred_pairs = predecessors
+    mask = np.zeros(cmdp.nb_states(), dtype=bool)
+    mask[states] = True
+    frontier = np.asarray(states, dtype=np.int64)
+    while len(frontier) > 0:
+        _, indices = csr_rows(pred_offsets, frontier)
+        pred   = pred_pairs[indices]
+        preds  = cmdp.pair_states_[pred]
+        preds  = np.unique(preds[(pairs[preds] == pred) & ~mask[preds]])
+        mask[preds] = True
+        frontier = preds
+    return np.flatnonzero(mask)
+
+def evaluate_pairs(cmdp: CompiledMDP, pairs: np.ndarray, gamma: float, stopping_threshold: float, v: np.ndarray, states: np.ndarray) -> np.ndarray:
+    '''
+      Computes iteratively the value of the policy given by pairs, starting from v (which is not modified), 
+      but only backs up the specified states: the values of the other states are kept.
+    '''
+    v       = v.copy()
+    states  = states[pairs[states] >= 0]
+    owners, outcomes = csr_rows(cmdp.pair_offsets_, pairs[states])
+    rewards = cmdp.expected_rewards_[pairs[states]]
+    probs   = cmdp.probs_[outcomes]
+    succ    = cmdp.successors_[outcomes]
+    while True:
+        new  = rewards + gamma * np.bincount(owners, weights=probs * v[succ], minlength=len(states))
+        diff = np.abs(new - v[states]).max(initial=0)
+        v[states] = new
+        if diff < stopping_threshold:
+            return v
+
+def vectorized_policy_iteration(mdp: MDP, gamma: float, epsilon: float, stopping_threshold: float) -> Policy:
+    '''
+      Performs the policy iteration algorithm on the compiled version of the specified MDP.
+      Same contract as algos.policy_iteration: 
+      the action of a state only changes if it is more than epsilon away from the greedy value, 
+      and the algorithm stops when no action changes.
+      After an improvement, only the states that can reach a changed state under the new policy are re-evaluated 
+      (the values of the other states do not depend on the change).
+    '''
+    cmdp         = to_compiled(mdp)
+    predecessors = compute_predecessor_index(cmdp)
+    starts       = cmdp.state_offsets_[:-1]
+    pairs        = np.where(starts < cmdp.state_offsets_[1:], starts, -1)
+    v            = np.zeros(cmdp.nb_states())
+    affected     = np.arange(cmdp.nb_states())
+    pol          = ArrayPolicy(cmdp, pair_actions(cmdp, pairs))
+    while True:
+        v = evaluate_pairs(cmdp, pairs, gamma, stopping_threshold, v, affected)
+        q = compute_q_vector(cmdp, v, gamma)
+        greedy, greedy_v = greedy_pairs(cmdp, q)
+        # the current action is kept when it is nearly greedy (cf. algos.is_policy_nearly_greedy)
+        keep      = (pairs < 0) | (q[np.maximum(pairs, 0)] + epsilon >= greedy_v)
+        new_pairs = np.where(keep, pairs, greedy)
+        new_pol   = ArrayPolicy(cmdp, pair_actions(cmdp, new_pairs))
+        changed   = new_pol.changed_states(pol)
+        if len(changed) == 0:
+            return pol
+        pairs, pol = new_pairs, new_pol
+        affected   = policy_ancestors(cmdp, pairs, changed, predecessors)
+
+#!------------------------------------------------------------------------------------------------------
+def action_dtype(nb_actions: int) -> np.dtype:
+    '''
+      The smallest signed integer type that can hold the action ids and -1.
+    '''
+    for dtype in (np.int8, np.int16, np.int32):
+        if nb_actions <= np.iinfo(dtype).max:
+            return np.dtype(dtype)
+    return np.dtype(np.int64)
+
+@dataclass
+class FiniteHorizonSolution:
+    '''
+      The result of finite_horizon_value_iteration.
+      action_ids[t,i] is the id of the optimal action in the state with id i at time t (H - t steps to go), -1 if none; 
+      values[t,i] is the optimal value of this state at time t (values[H] is 0).
+      In the memory-light mode, only the first step is kept (action_ids and values have one row).
+    '''
+    cmdp: CompiledMDP
+    horizon: int
+    action_ids: np.ndarray
+    values: np.ndarray
+
+    def stored_steps(self) -> int:
+        return len(self.action_ids)
+
+    def _check_step(self, t: int, rows: np.ndarray, what: str) -> None:
+        if not 0 <= t < len(rows):
+            raise ValueError(f'The {what} at time {t} is not stored ({self.stored_steps()} stored steps out of {self.horizon})')
+
+    def action(self, s: State, t: int) -> Action:
+        '''
+          The optimal action in state s at time t.
+        '''
+        self._check_step(t, self.action_ids, 'policy')
+        act_id = self.action_ids[t, self.cmdp.state_id(s)]
+        return None if act_id < 0 else self.cmdp.action(act_id)
+
+    def value(self, s: State, t: int = 0) -> float:
+        self._check_step(t, self.values, 'value')
+        return float(self.values[t, self.cmdp.state_id(s)])
+
+    def policy(self, t: int) -> ArrayPolicy:
+        '''
+          The (Markov) policy followed at time t.
+        '''
+        self._check_step(t, self.action_ids, 'policy')
+        return ArrayPolicy(self.cmdp, self.action_ids[t])
+
+    def value_function(self, t: int = 0) -> ArrayStateValueFunction:
+        self._check_step(t, self.values, 'value')
+        return ArrayStateValueFunction(self.cmdp, self.values[t])
+
+def finite_horizon_value_iteration(mdp: MDP, horizon: int, gamma: float = 1., memory_light: bool = False) -> FiniteHorizonSolution:
+    '''
+      Computes the optimal time-dependent policy for the specified horizon by backward induction: 
+      exactly horizon vectorized Bellman backups, from the last step (value 0) to the first one.
+      The actions are stored with the smallest integer type that can hold the action ids (cf. action_dtype).
+      If memory_light is set, only the policy and the value of the first step are kept 
+      (the memory then does not depend on the horizon).
+    '''
+    if horizon < 1:
+        raise ValueError(f'Invalid horizon {horizon}, expected a positive number of steps')
+    cmdp       = to_compiled(mdp)
+    nb_stored  = 1 if memory_light else horizon
+    action_ids = np.full((nb_stored, cmdp.nb_states()), -1, dtype=action_dtype(cmdp.nb_actions()))
+    values     = np.zeros((1 if memory_light else horizon + 1, cmdp.nb_states()))
+    vs         = np.zeros(cmdp.nb_states())
+    for t in reversed(range(horizon)):
+        pairs, vs = vectorized_bellman_backup(cmdp, vs, gamma)
+        if t < nb_stored:
+            action_ids[t] = pair_actions(cmdp, pairs)
+            values[t]     = vs
+    return FiniteHorizonSolution(cmdp, horizon, action_ids, values)
+
+# eof